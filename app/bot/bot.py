@@ -1,27 +1,52 @@
 import logging
 import asyncio
 from contextlib import suppress
+from typing import Callable
 
 import psycopg_pool
 from redis.asyncio import Redis
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.fsm.storage.redis import RedisStorage
 from app.bot.middlewares.redis_storage import RedisMiddleware
 from config.config import Config
+from app.bot.cluster import IntakeMiddleware, UpdateConsumer, updates_stream
 from app.bot.handlers.admin import admin_router
 from app.bot.handlers.user import user_router
 from app.bot.handlers.other import other_router
 from app.bot.handlers.registration import registration_router
 from app.bot.middlewares.database import DataBaseMiddleware
+from app.bot.middlewares.identity import IdentityMiddleware
+from app.bot.middlewares.rate_governor import GLOBAL_BURST, GLOBAL_RATE, RateGovernor
+from app.bot.middlewares.scheduler import ChatQueue, UpdateScheduler
+from app.bot.services.broadcast import Broadcaster
+from app.bot.services.warmup import MediaWarmer
+from app.bot.services.chat_action import ChatActionManager
+from app.bot.services.delivery_queue import STREAM_KEY as DELIVERY_STREAM, DeliveryWorker
+from app.bot.services.notifications import AdminNotifier
+from app.bot.services.scoreboard import PinnedLeaderboard
+from app.bot.webhook import run_webhook
+from app.infrastructure.cache.users import UserContextCache
+from app.infrastructure.database.catalog import get_catalog, load_catalog, refresh_catalog
 from app.infrastructure.database.connection import get_pg_pool
+from app.infrastructure.game.counters import TeamCounters
+from app.infrastructure.game.history import VisitHistory
+from app.infrastructure.game.leaderboard import Leaderboard
+from app.infrastructure.game.visits import migrate_visit_sets
+from app.infrastructure.media.registry import MediaRegistry
+from app.infrastructure.media.warmup import warmup_media
+from app.infrastructure.streams.consumer import StreamConsumer
 from app.infrastructure.integration.sheets_import import import_all_from_config
 from app.infrastructure.integration.sheets_sync import sync_all
 
 
 logger = logging.getLogger(__name__)
 
+CATALOG_REFRESH_SEC = 60
+
 async def _periodic_worker(
     pool: psycopg_pool.AsyncConnectionPool,
     interval_min: int,
@@ -47,9 +72,8 @@ async def _periodic_worker(
 
 
 
-async def main(config: Config) -> None:
-    logger.info('Starting bot...')
-    redis=Redis(
+def _create_redis(config: Config) -> Redis:
+    return Redis(
             host=config.redis.host,     
             port=config.redis.port,
             db=config.redis.db,
@@ -57,10 +81,89 @@ async def main(config: Config) -> None:
             username=config.redis.username,
             decode_responses=True,
         )
-    storage = RedisStorage(redis=redis)
 
-    bot = Bot(token=config.bot.token,
+
+def _create_bot(config: Config) -> Bot:
+    session = None
+    if config.bot.api_url:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(config.bot.api_url))
+    return Bot(token=config.bot.token,
+              session=session,
               default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+
+def _include_routers(dp: Dispatcher) -> None:
+    dp.include_router(registration_router)
+    dp.include_router(admin_router)
+    dp.include_router(user_router)
+    dp.include_router(other_router)
+
+
+async def _catalog_refresher(pool: psycopg_pool.AsyncConnectionPool, interval: float) -> None:
+    # каталог импортирует ведущий процесс, остальные подхватывают его по отпечатку
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_catalog(pool)
+        except Exception:
+            logger.exception("[catalog] refresh failed")
+
+
+async def _drain_stale_streams(
+    redis: Redis,
+    *kinds: tuple[str, set[str], Callable[[str], StreamConsumer]],
+) -> None:
+    # после смены режима или CLUSTER_WORKERS в старых потоках могут остаться задания и апдейты
+    for pattern, live, make_consumer in kinds:
+        async for stream in redis.scan_iter(match=pattern, _type="STREAM"):
+            if stream in live:
+                continue
+            logger.info("[streams] draining stale %s", stream)
+            try:
+                await make_consumer(stream).drain()
+            except Exception:
+                logger.exception("[streams] drain of %s failed", stream)
+
+
+async def run_intake(config: Config) -> None:
+    logger.info('Starting intake...')
+    redis = _create_redis(config)
+    bot = _create_bot(config)
+    dp = Dispatcher()
+    # роутеры здесь только для allowed_updates, обработку делают воркеры
+    _include_routers(dp)
+    dp.update.outer_middleware(IntakeMiddleware(redis, config.cluster.workers))
+    try:
+        # без фоновой обработки апдейты одного чата попадают в поток в порядке получения
+        if config.webhook.enabled:
+            await run_webhook(dp, bot, config.webhook, handle_in_background=False)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot, handle_as_tasks=False)
+    finally:
+        await redis.aclose()
+
+
+async def main(config: Config) -> None:
+    if config.cluster.role == "intake":
+        await run_intake(config)
+        return
+
+    worker = config.cluster.role == "worker"
+    # импорт, сбросы в Postgres, рейтинг и прочие общие задачи — только в одном процессе
+    leader = not worker or config.cluster.worker_index == 0
+    if worker:
+        logger.info('Starting worker %d...', config.cluster.worker_index)
+    else:
+        logger.info('Starting bot...')
+    redis = _create_redis(config)
+    storage = RedisStorage(redis=redis)
+
+    bot = _create_bot(config)
+    # все исходящие запросы проходят через общие лимиты Telegram, в кластере лимит делится на воркеров
+    share = config.cluster.workers if worker else 1
+    governor = RateGovernor(global_rate=GLOBAL_RATE / share, global_burst=GLOBAL_BURST / share)
+    bot.session.middleware(governor)
     dp = Dispatcher(storage=storage)
 
     db_pool: psycopg_pool.AsyncConnectionPool = await get_pg_pool(
@@ -71,56 +174,185 @@ async def main(config: Config) -> None:
         password=config.db.password,
     )
     admin_pass = config.bot.admin_pass
+    media_registry = MediaRegistry(redis)
+    chat_actions = ChatActionManager(bot)
+    broadcaster = Broadcaster(bot, db_pool)
+    media_warmer = MediaWarmer(bot, media_registry, config.media.stash_chat_id, config.media.warmup_concurrency)
+    notifier = AdminNotifier(bot, redis, db_pool)
+    leaderboard = Leaderboard(redis, config.game.score_travel_weight, config.game.score_clue_weight)
+    counters = TeamCounters(redis, db_pool, config.game.counters_flush_sec, leaderboard)
+    history = VisitHistory(redis, db_pool, config.game.visits_flush_sec)
+
+    def delivery_worker(stream: str) -> DeliveryWorker:
+        return DeliveryWorker(
+            bot, redis, media_registry, chat_actions, counters, history, notifier,
+            consumer=config.delivery.consumer,
+            concurrency=config.delivery.concurrency,
+            stream=stream,
+        )
+
+    def update_consumer(stream: str) -> UpdateConsumer:
+        return UpdateConsumer(dp, bot, redis, stream, consumer=config.cluster.consumer)
+
+    # задания чата ставит воркер его раздела, он же их и доставляет
+    if worker:
+        delivery_streams = {f"{DELIVERY_STREAM}:{index}" for index in range(config.cluster.workers)}
+        update_streams = {updates_stream(index) for index in range(config.cluster.workers)}
+        delivery = delivery_worker(f"{DELIVERY_STREAM}:{config.cluster.worker_index}")
+    else:
+        delivery_streams, update_streams = {DELIVERY_STREAM}, set()
+        delivery = delivery_worker(DELIVERY_STREAM)
 
     logger.info('Including routers...')
-    dp.include_router(registration_router)
-    dp.include_router(admin_router)
-    dp.include_router(user_router)
-    dp.include_router(other_router)
+    _include_routers(dp)
 
     logger.info('Including middlewares...')
+    # очередь чата — до FSMContextMiddleware, иначе второй апдейт чата увидит состояние до первого
+    dp.update.outer_middleware.unregister(dp.fsm)
+    dp.update.outer_middleware(ChatQueue())
+    dp.update.outer_middleware(dp.fsm)
+    user_cache = UserContextCache(redis)
+    scheduler = UpdateScheduler(
+        user_cache,
+        notifier,
+        config.scheduler.concurrency,
+        config.scheduler.registration_backlog,
+        config.scheduler.gameplay_backlog,
+        config.scheduler.other_backlog,
+    )
     dp.update.middleware(DataBaseMiddleware())
     dp.update.middleware(RedisMiddleware(storage.redis))
+    # до IdentityMiddleware: ее запрос в Postgres при промахе кеша идет уже внутри слота
+    dp.update.middleware(scheduler)
+    dp.update.middleware(IdentityMiddleware(user_cache))
 
     sync_task: asyncio.Task | None = None
     import_task: asyncio.Task | None = None
+    warmup_task: asyncio.Task | None = None
+    counters_task: asyncio.Task | None = None
+    history_task: asyncio.Task | None = None
+    leaderboard_task: asyncio.Task | None = None
+    notifier_task: asyncio.Task | None = None
+    delivery_task: asyncio.Task | None = None
+    drain_task: asyncio.Task | None = None
+    user_cache_task: asyncio.Task | None = None
+    admins_task: asyncio.Task | None = None
+    catalog_task: asyncio.Task | None = None
 
 
     try:
-        if getattr(config.sheets, "import_on_start", False):
+        if leader and getattr(config.sheets, "import_on_start", False):
             try:
                 res = await import_all_from_config(db_pool)
                 logger.info("[import] on start: %s", res)
             except Exception:
                 logger.exception("[import] on start failed")
 
-        if getattr(config.sheets, "sync_on_start", False):
+        # импорт сам перезагружает каталог, здесь — если импорт выключен или упал
+        if not get_catalog().version:
+            await load_catalog(db_pool, assign_slots=leader)
+        if leader:
+            await migrate_visit_sets(redis, get_catalog())
+            if config.game.restore_visits_on_start:
+                # Postgres — источник правды, битовые карты в Redis только дополняем
+                try:
+                    await history.restore(get_catalog())
+                except Exception:
+                    logger.exception("[history] restore on start failed")
+            # веса очков могли поменяться — пересобираем рейтинг из teams и несброшенных дельт
+            await leaderboard.rebuild(await counters.all_totals())
+        else:
+            catalog_task = asyncio.create_task(
+                _catalog_refresher(db_pool, CATALOG_REFRESH_SEC), name="catalog-refresh"
+            )
+
+        if leader and getattr(config.sheets, "sync_on_start", False):
             try:
                 res = await sync_all(db_pool)
                 logger.info("[sync] on start: %s", res)
             except Exception:
                 logger.exception("[sync] on start failed")
 
-        if getattr(config.sheets, "sync_interval_min", 0) and config.sheets.sync_interval_min > 0:
+        if leader and getattr(config.sheets, "sync_interval_min", 0) and config.sheets.sync_interval_min > 0:
             sync_task = asyncio.create_task(
                 _periodic_worker(db_pool, config.sheets.sync_interval_min, sync_all, "sheets-sync"),
                 name="sheets-sync",
             )
             logger.info("[sync] periodic worker started: every %s min", config.sheets.sync_interval_min)
 
-        await dp.start_polling(
-            bot,
+        if leader:
+            counters_task = asyncio.create_task(counters.run(), name="team-counters")
+            history_task = asyncio.create_task(history.run(), name="visit-history")
+            # события копятся в Redis, дайджест один на всех воркеров
+            notifier_task = asyncio.create_task(notifier.run(), name="admin-notifier")
+        delivery_task = asyncio.create_task(delivery.run(), name="delivery")
+        # роли и команды кешируются в каждом процессе, инвалидации приходят через pub/sub
+        user_cache_task = asyncio.create_task(user_cache.listen(), name="user-cache")
+        await scheduler.load_admins()
+        admins_task = asyncio.create_task(scheduler.watch_admins(), name="scheduler-admins")
+
+        if leader and config.game.leaderboard_chat_id:
+            pinned = PinnedLeaderboard(
+                bot, redis, leaderboard, config.game.leaderboard_chat_id, config.game.leaderboard_refresh_sec
+            )
+            leaderboard_task = asyncio.create_task(pinned.run(), name="leaderboard-pin")
+
+        if leader and config.media.warmup_on_start:
+            if config.media.stash_chat_id:
+                warmup_task = asyncio.create_task(
+                    warmup_media(bot, media_registry, config.media.stash_chat_id, config.media.warmup_concurrency),
+                    name="media-warmup",
+                )
+            else:
+                logger.warning("[warmup] MEDIA_STASH_CHAT_ID is not set, skipping")
+
+        workflow_data = dict(
             db_pool=db_pool,
-            admin_pass=admin_pass
+            admin_pass=admin_pass,
+            media_registry=media_registry,
+            media_settings=config.media,
+            chat_actions=chat_actions,
+            counters=counters,
+            history=history,
+            leaderboard=leaderboard,
+            broadcaster=broadcaster,
+            media_warmer=media_warmer,
+            notifier=notifier,
+            governor=governor,
+            scheduler=scheduler,
+            delivery=delivery,
         )
+        # хендлерам нужны зависимости и когда апдейты приходят из потока, а не от поллинга
+        dp.workflow_data.update(workflow_data)
+        if leader:
+            drain_task = asyncio.create_task(
+                _drain_stale_streams(
+                    redis,
+                    (f"{DELIVERY_STREAM}*", delivery_streams, delivery_worker),
+                    (updates_stream("*"), update_streams, update_consumer),
+                ),
+                name="stale-streams",
+            )
+        if worker:
+            consumer = update_consumer(updates_stream(config.cluster.worker_index))
+            await consumer.run()
+        elif config.webhook.enabled:
+            await run_webhook(dp, bot, config.webhook, **workflow_data)
+        else:
+            # вебхук от прошлого запуска в режиме webhook мешает getUpdates
+            await bot.delete_webhook()
+            await dp.start_polling(bot, **workflow_data)
     except Exception as e:
         logger.exception(e)
     finally:
-        for task in (sync_task, import_task):
+        for task in (drain_task, delivery_task, user_cache_task, admins_task, catalog_task, sync_task, import_task, warmup_task, counters_task, history_task, leaderboard_task, notifier_task):
             if task:
                 task.cancel()
                 with suppress(asyncio.CancelledError):
                     await task
+        await broadcaster.shutdown()
+        await media_warmer.shutdown()
+        await bot.session.close()
         await db_pool.close()
         await dp.storage.close()
         try:
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+from contextlib import suppress
+from dataclasses import replace
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+from redis.asyncio import Redis
+
+from app.infrastructure.streams.consumer import StreamConsumer
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+GROUP = "workers"
+STREAM_MAXLEN = 100_000
+# сколько прочитанных апдейтов ждут очереди своего чата; сколько хендлеров работает и в каком порядке,
+# решает UpdateScheduler — семафор здесь пускал бы по порядку и держал админов за игроками
+UPDATES_CAPACITY = 1024
+# апдейт обрабатывается быстро, минута без ack — процесс упал
+CLAIM_IDLE_MS = 60 * 1000
+
+
+def updates_stream(partition: int) -> str:
+    return f"updates:{partition}"
+
+
+def chat_key(update: Update) -> int:
+    # у inline-запросов чата нет, тогда очередь по пользователю
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat:
+        return context.chat.id
+    if context.user:
+        return context.user.id
+    return 0
+
+
+def partition_of(update: Update, partitions: int) -> int:
+    # сам id, а не hash(): номер раздела должен совпадать во всех процессах
+    return chat_key(update) % partitions
+
+
+class IntakeMiddleware(BaseMiddleware):
+    def __init__(self, redis: Redis, partitions: int):
+        super().__init__()
+        self.redis = redis
+        self.partitions = partitions
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        # хендлеры здесь не вызываются — апдейт обработает воркер своего раздела
+        await self.redis.xadd(
+            updates_stream(partition_of(event, self.partitions)),
+            {"update": event.model_dump_json(exclude_unset=True)},
+            maxlen=STREAM_MAXLEN,
+            approximate=True,
+        )
+
+
+class UpdateConsumer(StreamConsumer):
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        redis: Redis,
+        stream: str,
+        consumer: str = "main",
+        capacity: int = UPDATES_CAPACITY,
+    ):
+        super().__init__(redis, stream, GROUP, consumer, None, CLAIM_IDLE_MS, capacity)
+        self.dp = dp
+        self.bot = bot
+
+    def parse(self, fields: dict[str, str]) -> tuple[int, Update]:
+        # апдейты одного чата идут строго по очереди — на этом держатся FSM-сценарии
+        update = Update.model_validate_json(fields["update"], context={"bot": self.bot})
+        return chat_key(update), update
+
+    async def process(self, entry_id: str, update: Update) -> None:
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception:
+            logger.exception("[worker] update %s failed", update.update_id)
+
+
+def _run_process(config: Config) -> None:
+    logging.basicConfig(level=logging.getLevelName(config.log.level), format=config.log.format)
+    # SIGTERM превращаем в KeyboardInterrupt, чтобы main() дошел до finally
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    from app.bot.bot import main
+
+    with suppress(KeyboardInterrupt):
+        asyncio.run(main(config))
+
+
+def run_cluster(config: Config) -> None:
+    configs = [replace(config, cluster=replace(config.cluster, role="intake"))]
+    configs += [
+        replace(config, cluster=replace(config.cluster, role="worker", worker_index=index))
+        for index in range(config.cluster.workers)
+    ]
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_run_process, args=(cfg,), name=f"{cfg.cluster.role}-{cfg.cluster.worker_index}")
+        for cfg in configs
+    ]
+    for process in processes:
+        process.start()
+    logger.info("[cluster] started intake and %d workers", config.cluster.workers)
+
+    def stop(*_: Any) -> None:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Ctrl+C получили все процессы группы, ждем их корректной остановки
+        for process in processes:
+            process.join()
+    for process in processes:
+        logger.info("[cluster] %s exited with %s", process.name, process.exitcode)
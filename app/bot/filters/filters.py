@@ -1,11 +1,12 @@
 import re
+from dataclasses import dataclass
+from difflib import get_close_matches
 
 from aiogram.filters import BaseFilter
 from aiogram.types import CallbackQuery, Message
-from psycopg import AsyncConnection
 
 from app.bot.enums.roles import UserRole
-from app.infrastructure.database.db import get_user_role
+from app.infrastructure.database.catalog import Catalog, Place, get_catalog
 
 class UserRoleFilter(BaseFilter):
     def __init__(self, *roles: str | UserRole):
@@ -20,25 +21,23 @@ class UserRoleFilter(BaseFilter):
 
         if not self.roles:
             raise ValueError('No valid roles provided to UserRoleFilter')
-    async def __call__(self, event: Message | CallbackQuery, conn: AsyncConnection):
+    async def __call__(self, event: Message | CallbackQuery, user_role: UserRole | None = None):
         user = event.from_user
         if not user:
             return False
 
-        role = await get_user_role(conn, user_id = user.id)
-        if role is None:
+        if user_role is None:
             return False
 
-        return role in self.roles
+        return user_role in self.roles
 
 
 class UnregisteredUserFilter(BaseFilter):
-    async def __call__(self, event: Message | CallbackQuery, conn: AsyncConnection):
+    async def __call__(self, event: Message | CallbackQuery, user_role: UserRole | None = None):
         user = event.from_user
         if not user:
             return False
-        role = await get_user_role(conn, user_id = user.id)
-        return role is None
+        return user_role is None
     
 LAT_TO_CYR = str.maketrans({
     # заглавные
@@ -47,25 +46,20 @@ LAT_TO_CYR = str.maketrans({
     "a":"а","b":"в","c":"с","e":"е","h":"н","k":"к","m":"м","o":"о","p":"р","t":"т","x":"х","y":"у",
 })
 
+_DISTRICT_TABLE = {**LAT_TO_CYR, ord(" "): None}  # латиница -> кириллица, без пробелов
+
+# частые синонимы/слепания: С-З, Ю-З, С-В, Ю-В
+_DISTRICT_SYNONYMS = re.compile(r"([СЮ])-([ЗВ])")
+
+PATTERN = re.compile(
+    r'^\s*([A-Za-zА-Яа-яЁё]{1,3})(?:\s*[-–—−]\s*|\s+)([0-9]{1,3})\s*$'
+)
+
 def normalize_district(raw: str) -> str:
-    s = raw.strip().translate(LAT_TO_CYR)  # латиницу -> кириллица
-    s = s.replace(" ", "").upper()         # убираем пробелы и в верхний регистр
-    # частые синонимы/слепания
-    s = s.replace("С-З", "СЗ").replace("С З", "СЗ")
-    s = s.replace("Ю-З", "ЮЗ").replace("Ю З", "ЮЗ")
-    s = s.replace("С-В", "СВ").replace("С В", "СВ")
-    s = s.replace("Ю-В", "ЮВ").replace("Ю В", "ЮВ")
-    return s
+    s = raw.strip().translate(_DISTRICT_TABLE).upper()
+    return _DISTRICT_SYNONYMS.sub(r"\1\2", s)
 
 def parse_location(text: str) -> tuple[str,int] | None:
-    text = text.strip().translate(LAT_TO_CYR)
-    text = re.sub(r"[–—−]", "-", text)
-    text = re.sub(r"([A-Za-zА-Яа-яЁё]+)\s+([0-9]+)", r"\1-\2", text)
-
-    PATTERN = re.compile(
-        r'^\s*([A-Za-zА-Яа-яЁё]{1,3})\s*-\s*([0-9]{1,3})\s*$',
-        re.IGNORECASE
-    )
     m = PATTERN.match(text)
     if not m:
         return None
@@ -73,4 +67,64 @@ def parse_location(text: str) -> tuple[str,int] | None:
     district_raw, num_raw = m.group(1), m.group(2)
     district = normalize_district(district_raw)
     number = int(num_raw)
-    return district, number
\ No newline at end of file
+    return district, number
+
+
+_CODE_SEPARATORS = re.compile(r"[,;\n]+")
+
+MAX_CODES = 10
+
+def split_codes(text: str) -> list[str]:
+    # "СЗ-4, Ю-16, В-7" — несколько кодов в одном сообщении
+    return [part for part in map(str.strip, _CODE_SEPARATORS.split(text)) if part]
+
+@dataclass(frozen=True, slots=True)
+class LocationMatch:
+    text: str
+    code: tuple[str, int] | None = None
+    place: Place | None = None
+    suggestions: tuple[str, ...] = ()
+
+
+class LocationParser:
+    def __init__(self, catalog: Catalog, max_suggestions: int = 3):
+        self.version = catalog.version
+        self.places = catalog.places
+        self.max_suggestions = max_suggestions
+        self.numbers: dict[str, tuple[int, ...]] = {
+            district: tuple(p.number for p in places)
+            for district, places in catalog.by_district.items()
+        }
+
+    def match(self, text: str) -> LocationMatch:
+        code = parse_location(text)
+        if code is None:
+            return LocationMatch(text)
+        place = self.places.get(code)
+        if place is not None:
+            return LocationMatch(text, code=code, place=place)
+        return LocationMatch(text, code=code, suggestions=self.suggest(*code))
+
+    def match_many(self, codes: list[str]) -> list[LocationMatch]:
+        return [self.match(code) for code in codes]
+
+    def _nearest(self, district: str, number: int, limit: int) -> list[str]:
+        numbers = sorted(self.numbers[district], key=lambda n: (abs(n - number), n))
+        return [f"{district}-{n}" for n in numbers[:limit]]
+
+    def suggest(self, district: str, number: int) -> tuple[str, ...]:
+        if district in self.numbers:
+            return tuple(self._nearest(district, number, self.max_suggestions))
+        # район опознать не удалось — ищем похожие и берем в них ближайший номер
+        districts = get_close_matches(district, self.numbers, n=self.max_suggestions, cutoff=0.3)
+        return tuple(code for d in districts for code in self._nearest(d, number, 1))
+
+
+_parser: LocationParser | None = None
+
+def get_location_parser() -> LocationParser:
+    global _parser
+    catalog = get_catalog()
+    if _parser is None or _parser.version != catalog.version:
+        _parser = LocationParser(catalog)
+    return _parser
@@ -1,14 +1,32 @@
 import logging
 
-from aiogram import Bot, Router
+from aiogram import Router
 from aiogram.filters import Command, StateFilter
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
-from psycopg import AsyncConnection
 from app.bot.enums.roles import UserRole
-from app.bot.filters.filters import UserRoleFilter
+from app.bot.filters.filters import UserRoleFilter, get_location_parser
+from app.bot.middlewares.rate_governor import RateGovernor
+from app.bot.middlewares.scheduler import UpdateScheduler
+from app.bot.services.broadcast import Broadcaster
+from app.bot.services.warmup import MediaWarmer
+from app.bot.services.scoreboard import TOP_LIMIT, format_top
 from app.bot.states.states import AdminState
-from app.infrastructure.database.db import delete_team, get_users
+from app.infrastructure.cache.users import UserContextCache
+from app.infrastructure.database.catalog import get_catalog
+from app.infrastructure.database.db import delete_team
+from app.infrastructure.database.session import LazyConnection
+from app.infrastructure.game.counters import TeamCounters
+from app.infrastructure.game.history import VisitHistory
+from app.infrastructure.game.leaderboard import Leaderboard
+from app.infrastructure.game.visits import (
+    combine_visits,
+    count_visits,
+    delete_visits,
+    district_progress,
+    get_visited_ids,
+    is_visited,
+)
 
 logger =  logging.getLogger(__name__)
 
@@ -36,66 +54,128 @@ async def message_cancel(message: Message, state: FSMContext):
     await state.clear()
 
 @admin_router.message(StateFilter(AdminState.message_to_all))
-async def send_message_to_all(message: Message, state: FSMContext, conn: AsyncConnection, bot: Bot):
-    users = await get_users(conn)
-    for user_id in users:
-        try:
-            if message.text:
-                await bot.send_message(user_id, message.text)
-            elif message.photo:
-                photo = message.photo[-1].file_id
-                caption = message.caption if message.caption else None
-                await bot.send_photo(user_id, photo, caption=caption)
-            elif message.animation:
-                animation = message.animation.file_id
-                caption = message.caption if message.caption else None
-                await bot.send_animation(user_id, animation, caption=caption)
-            else:
-                pass
-        except:
-            pass
+async def send_message_to_all(message: Message, state: FSMContext, broadcaster: Broadcaster):
+    # рассылка идет фоном, прогресс придет отдельным сообщением
+    broadcaster.start(message.chat.id, message.chat.id, message.message_id)
     await state.clear()
 
 @admin_router.message(Command("visits"))
-async def show_team_visits(message: Message, redis):
-    args = message.text.split()
-    if len(args) != 2 or not args[1].isdigit():
-        await message.answer('Неправильно, попробуй /visits <номер команды>', parse_mode=None)
+async def show_team_visits(message: Message, redis, conn: LazyConnection, counters: TeamCounters):
+    args = message.text.split(maxsplit=2)
+    if len(args) < 2 or not args[1].isdigit():
+        await message.answer('Неправильно, попробуй /visits <номер команды> [место]', parse_mode=None)
         return
     team = int(args[1])
-    visit_key = f"team:{team}:visited"
 
-    visited = await redis.smembers(visit_key)
-    if not visited:
+    if len(args) == 3:
+        # одно место — один GETBIT
+        match = get_location_parser().match(args[2])
+        if match.place is None:
+            await message.answer(f"Места {args[2]} нет в каталоге", parse_mode=None)
+            return
+        visited = await is_visited(redis, team, match.place.id)
+        await message.answer(f"Команда {team} {'была' if visited else 'не была'} в {match.place.code}", parse_mode=None)
+        return
+
+    visited_count = await count_visits(redis, team)
+    if not visited_count:
         await message.answer("Команда ничего не посетила")
         return
-    visited_places = [place for place in visited]
+    # вся карта читается только ради списка и разбивки по районам
+    catalog = get_catalog()
+    visited_ids = await get_visited_ids(redis, team)
+    visited_places = [place.code for place in catalog.places_by_id.values() if place.id in visited_ids]
     text = f"Команда {team} посетила:\n" + "\n".join(visited_places)
+    progress = district_progress(visited_ids, catalog)
+    text += "\n\nПо районам:\n" + "\n".join(
+        f"{district}: {done}/{total}" for district, (done, total) in progress.items() if done
+    )
+    text += f"\nВсего: {visited_count}/{len(catalog.places)}"
+    totals = await counters.totals(conn, team)
+    if totals:
+        text += f"\n\nПутешествий: {totals[0]}, папок: {totals[1]}"
     await message.answer(text=text)
 
+TOP_BOARDS = {"очки": "score", "места": "travels", "папки": "clue"}
+
+@admin_router.message(Command("top"))
+async def show_top(message: Message, leaderboard: Leaderboard):
+    args = message.text.split()[1:]
+    limit, board = TOP_LIMIT, "score"
+    for arg in args:
+        if arg.isdigit() and int(arg) > 0:
+            limit = min(int(arg), 100)
+        elif arg.lower() in TOP_BOARDS:
+            board = TOP_BOARDS[arg.lower()]
+        else:
+            await message.answer('Неправильно, попробуй /top [количество] [очки|места|папки]', parse_mode=None)
+            return
+    rows = await leaderboard.top(limit, board)
+    await message.answer(format_top(rows))
+
+@admin_router.message(Command("common"))
+async def show_common_visits(message: Message, redis):
+    args = message.text.split()
+    if len(args) < 3 or not all(arg.isdigit() for arg in args[1:]):
+        await message.answer('Неправильно, попробуй /common <номер команды> <номер команды> ...', parse_mode=None)
+        return
+    teams = [int(arg) for arg in args[1:]]
+    catalog = get_catalog()
+    common_ids = await combine_visits(redis, teams, "AND")
+    common = [place.code for place in catalog.places_by_id.values() if place.id in common_ids]
+    if not common:
+        await message.answer("Общих мест нет")
+        return
+    await message.answer("Общие места:\n" + "\n".join(common))
+
 @admin_router.message(Command("delete_visits"))
-async def delete_visits(message: Message, redis):
+async def delete_team_visits(message: Message, redis, conn: LazyConnection, history: VisitHistory):
     args = message.text.split()
     if len(args) != 2 or not args[1].isdigit():
         await message.answer('Неправильно, попробуй /delete_visits <номер команды>', parse_mode=None)
         return
     team = int(args[1])
-    visit_key = f"team:{team}:visited"
-    await redis.delete(visit_key)
+    await history.forget(conn, team)
+    await delete_visits(redis, team)
     await message.answer(f"Вот и все, история команды {team} сброшена")
 
 @admin_router.message(Command("delete_team"))
-async def delete_team_everywhere(message: Message, conn: AsyncConnection, redis):
+async def delete_team_everywhere(
+    message: Message,
+    conn: LazyConnection,
+    redis,
+    counters: TeamCounters,
+    history: VisitHistory,
+    user_cache: UserContextCache,
+):
     args = message.text.split()
     if len(args) != 2 or not args[1].isdigit():
         await message.answer("Неправильно, попробуй /delete_team <номер команды>", parse_mode=None)
         return
     team = int(args[1])
-    visit_key = f"team:{team}:visited"
-    await redis.delete(visit_key)
-    deleted =await delete_team(conn, team)
-    if deleted:
+    await delete_visits(redis, team)
+    await counters.discard(team)
+    # delete_team удаляет и историю посещений, буфер нужно долить до этого
+    await history.flush()
+    async with conn.transaction() as tx:
+        deleted_user_id = await delete_team(tx, team)
+    if deleted_user_id:
+        await user_cache.invalidate(deleted_user_id)
         await message.answer(f"Вот и все. Команды {team} больше нет")
     else:
         await message.answer(f"Команда {team} не найдена")
-    
+
+@admin_router.message(Command("warmup"))
+async def warmup_media_command(message: Message, media_warmer: MediaWarmer):
+    if not media_warmer.stash_chat_id:
+        await message.answer("Не задан MEDIA_STASH_CHAT_ID")
+        return
+    if media_warmer.running:
+        await message.answer("Загрузка медиа уже идет")
+        return
+    # загрузка идет фоном, прогресс придет отдельным сообщением
+    media_warmer.start(message.chat.id)
+
+@admin_router.message(Command("stats"))
+async def show_send_stats(message: Message, governor: RateGovernor, scheduler: UpdateScheduler):
+    await message.answer(f"{governor.stats.format()}\n\n{scheduler.stats.format()}")
@@ -9,15 +9,17 @@ from aiogram.filters import CommandStart, StateFilter, Command
 from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import any_state
-from psycopg import AsyncConnection
 
 
 from app.bot.filters.filters import UnregisteredUserFilter
 from app.bot.enums.roles import UserRole
 from app.bot.keyboards.keyboards import reg_kb
 from app.bot.keyboards.menu_button import get_main_menu_command
+from app.bot.services.notifications import AdminNotifier
 from app.bot.states.states import RegState
+from app.infrastructure.cache.users import UserContextCache
 from app.infrastructure.database.db import add_team, add_user
+from app.infrastructure.database.session import LazyConnection
 
 
 logger = logging.getLogger(__name__)
@@ -44,7 +46,15 @@ async def admin_registration_starting(callback: CallbackQuery, state: FSMContext
     await callback.answer()
 
 @registration_router.message(StateFilter(RegState.admin_pass))
-async def admin_pass_verification(message: Message, state: FSMContext, admin_pass: int, conn: AsyncConnection, bot: Bot):
+async def admin_pass_verification(
+    message: Message,
+    state: FSMContext,
+    admin_pass: int,
+    conn: LazyConnection,
+    bot: Bot,
+    user_cache: UserContextCache,
+    notifier: AdminNotifier,
+):
     if message.text == str(admin_pass):
         await message.answer("Пароль верный, регистрация успешна")
         user_role = UserRole.ADMIN
@@ -54,6 +64,8 @@ async def admin_pass_verification(message: Message, state: FSMContext, admin_pas
             username=message.from_user.username,
             role=user_role
         )
+        await user_cache.invalidate(message.from_user.id)
+        await notifier.invalidate_admins()
         await bot.set_my_commands(
             commands=get_main_menu_command(user_role=user_role),
             scope=BotCommandScopeChat(
@@ -73,28 +85,37 @@ async def user_registration_starting(callback: CallbackQuery, state: FSMContext)
     await callback.answer()
 
 @registration_router.message(StateFilter(RegState.user_team))
-async def user_team_verification(message: Message, state: FSMContext, conn: AsyncConnection, bot: Bot):
+async def user_team_verification(
+    message: Message,
+    state: FSMContext,
+    conn: LazyConnection,
+    bot: Bot,
+    user_cache: UserContextCache,
+):
     if not message.text.isdigit():
         await message.answer("Введите только номер команды плиз")
         return
     team_number = int(message.text)
     user_role = UserRole.USER
-    added = await add_team(
-        conn,
-        user_id=message.from_user.id,
-        team=team_number,
-        role=user_role
-    )
+    async with conn.transaction() as tx:
+        added = await add_team(
+            tx,
+            user_id=message.from_user.id,
+            team=team_number,
+            role=user_role
+        )
+        if added:
+            await add_user(
+                tx,
+                user_id=message.from_user.id,
+                username=message.from_user.username,
+                role=user_role
+            )
     if not added:
         await message.answer(f"Команда {team_number} уже зарегистрирована, попробуйте другой номер")
         return
 
-    await add_user(
-        conn,
-        user_id=message.from_user.id,
-        username=message.from_user.username,
-        role=user_role
-    )
+    await user_cache.invalidate(message.from_user.id)
     await bot.set_my_commands(
             commands=get_main_menu_command(user_role=user_role),
             scope=BotCommandScopeChat(
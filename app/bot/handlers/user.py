@@ -1,51 +1,50 @@
 import logging
-import re
-import os
-import asyncio
+from contextlib import suppress
 
 from redis.asyncio import Redis
-from aiogram import Bot, Router, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, FSInputFile
+from aiogram import Router, F
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import (
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultsButton,
+    InputTextMessageContent,
+    Message,
+)
 from aiogram.filters import Command, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
-from psycopg.connection_async import AsyncConnection
 from app.bot.enums.roles import UserRole
-from app.bot.keyboards.keyboards import make_district_keyboard, user_start_kb, make_tags_keyboard
-from app.bot.filters.filters import parse_location
+from app.bot.keyboards.callbacks import DistrictCallback, TagCallback
+from app.bot.keyboards.keyboards import (
+    NO_TAG,
+    district_listing_page,
+    make_district_keyboard,
+    make_tags_keyboard,
+    tag_listing_page,
+    user_start_kb,
+)
+from app.bot.filters.filters import MAX_CODES, get_location_parser, split_codes
+from app.bot.services.delivery_queue import DeliveryWorker, RevealJob
 from app.bot.states.states import UserState
+from app.infrastructure.database.catalog import search_places
 from app.infrastructure.database.db import (
     add_answer,
-    add_clue,
-    add_travel,
     add_user,
-    get_admins,
-    get_answer,
-    get_places_by_district,
-    get_places_by_tag,
-    get_team_by_user,
     get_user,
-    get_tags
 )
+from app.infrastructure.database.session import LazyConnection
+from app.infrastructure.game.visits import claim_visits, release_visits
 
 
 logger = logging.getLogger(__name__)
 
 user_router = Router()
 
-MEDIA_ROOT = "media"
-
-EXTENSIONS = {
-    "photo": [".jpg", ".jpeg", ".png", ".gif", ".webp"],
-    "video": [".mp4", ".mov", ".avi", ".mkv"],
-    "audio": [".mp3", ".ogg", ".wav", ".m4a"],
-}
-
-def get_media_type(filename: str) -> str | None:
-    ext = os.path.splitext(filename.lower())[1]
-    for kind, exts in EXTENSIONS.items():
-        if ext in exts:
-            return kind
-    return None
+# результаты зависят только от каталога, но доступны лишь зарегистрированным
+INLINE_CACHE_TIME = 300
 
 
 @user_router.message(CommandStart())
@@ -53,47 +52,64 @@ async def user_start_command(message: Message):
     await message.answer(text='Категории и районы', reply_markup=user_start_kb)
 
 @user_router.callback_query(F.data == "tag")
-async def show_tags(callback: CallbackQuery, conn):
-    keyboard= await make_tags_keyboard(conn)
+async def show_tags(callback: CallbackQuery):
+    keyboard = make_tags_keyboard()
     await callback.message.answer(text="Выберите категорию:", reply_markup=keyboard)
     await callback.answer()
 
 @user_router.callback_query(F.data == "district")
-async def show_districts(callback: CallbackQuery, conn):
-    keyboard = await make_district_keyboard(conn)
+async def show_districts(callback: CallbackQuery):
+    keyboard = make_district_keyboard()
     await callback.message.answer(text="Выберите район:", reply_markup=keyboard)
     await callback.answer()
 
-@user_router.callback_query(F.data.startswith("tag_"))
-async def show_places_by_tag(callback: CallbackQuery, conn):
-    tag = callback.data.removeprefix("tag_")
-    rows = await get_places_by_tag(conn, tag)
-    text = f"<b>{tag}</b>:\n"
-    for district, number, name in rows:
-        text += f"{district}-{number} {name}\n"
-    await callback.message.answer(text)
+@user_router.callback_query(TagCallback.filter())
+async def show_places_by_tag(callback: CallbackQuery, callback_data: TagCallback):
+    text, keyboard = tag_listing_page(callback_data.id, callback_data.page)
+    if callback_data.nav:
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    else:
+        await callback.message.answer(text, reply_markup=keyboard)
     await callback.answer()
 
-@user_router.callback_query(F.data.startswith("district_"))
-async def show_places_by_district(callback: CallbackQuery, conn):
-    district = callback.data.removeprefix("district_")
-    rows = await get_places_by_district(conn, district)
-    text = f"<b>{district}</b>:\n"
-    for district, number, name in rows:
-        text += f"{district}-{number} {name}\n"
-    await callback.message.answer(text)
+@user_router.callback_query(DistrictCallback.filter())
+async def show_places_by_district(callback: CallbackQuery, callback_data: DistrictCallback):
+    text, keyboard = district_listing_page(callback_data.id, callback_data.page)
+    if callback_data.nav:
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    else:
+        await callback.message.answer(text, reply_markup=keyboard)
     await callback.answer()
 
+@user_router.inline_query()
+async def search_places_inline(inline_query: InlineQuery, user_role: UserRole | None):
+    if user_role is None:
+        await inline_query.answer(
+            [],
+            cache_time=INLINE_CACHE_TIME,
+            is_personal=True,
+            button=InlineQueryResultsButton(text="Сначала зарегистрируйтесь", start_parameter="reg"),
+        )
+        return
+
+    results = [
+        InlineQueryResultArticle(
+            id=str(place.id),
+            title=f"{place.code} {place.name or ''}",
+            description=place.tag or NO_TAG,
+            input_message_content=InputTextMessageContent(message_text=place.code),
+        )
+        for place in search_places(inline_query.query)
+    ]
+    await inline_query.answer(results, cache_time=INLINE_CACHE_TIME, is_personal=True)
+
 @user_router.message(Command(commands='help'))
 async def admin_help_command(message: Message):
     await message.answer(text='user help')
 
 @user_router.message(Command(commands='getteam'))
-async def test_command(message: Message, conn: AsyncConnection):
-    user_id = message.from_user.id
-    row = await get_team_by_user(conn, user_id)
-    team = str(row[0])
-    await message.answer(text=team)
+async def test_command(message: Message, team: int | None):
+    await message.answer(text=str(team))
 
 @user_router.message(Command(commands='answer'))
 async def answer_command(message: Message, state: FSMContext):
@@ -114,7 +130,7 @@ async def reg_cancel_button(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @user_router.message(StateFilter(UserState.write_answer))
-async def write_answer(message: Message, state: FSMContext, conn: AsyncConnection):
+async def write_answer(message: Message, state: FSMContext, conn: LazyConnection):
     if not message.text:
         await message.answer("Введите ответ текстом только")
         return
@@ -130,84 +146,63 @@ async def write_answer(message: Message, state: FSMContext, conn: AsyncConnectio
 
 
 @user_router.message(F.text)
-async def handle_district_number(message: Message, conn: AsyncConnection, redis: Redis, bot: Bot):
-    processing = await message.answer("Обрабобка запроса...")
-    parsed = parse_location(message.text)
-    if not parsed:
-        await processing.edit_text("Непрааавильно. Нужный формат: <район>-<номер>, например: СЗ-4, Ю - 16, В-7.", parse_mode=None)
-        return
-    district, number = parsed
-
-    row = await get_answer(conn, district, number)
-    if row is None:
-        await processing.edit_text("Такой локации не существует")
-        return
-    name, answer, papka = row
-    user_id = message.from_user.id
-
-    team_row = await get_team_by_user(conn, user_id)
-    team = str(team_row[0]) if team_row else None
-    if not team:
-        await processing.edit_text("У тебя нет команды ...")
+async def handle_district_number(
+    message: Message,
+    redis: Redis,
+    delivery: DeliveryWorker,
+    team: int | None,
+):
+    codes = split_codes(message.text)
+    matches = get_location_parser().match_many(codes[:MAX_CODES])
+    if not any(match.code for match in matches):
+        await message.answer("Непрааавильно. Нужный формат: <район>-<номер>, например: СЗ-4, Ю - 16, В-7.", parse_mode=None)
         return
-    
-    visit_key = f"team:{team}:visited"
-    place_code = f"{district}-{number}"
 
-    already = await redis.sismember(visit_key, place_code)
-    if already:
-        await processing.edit_text("Вы уже были здесь")
+    if team is None:
+        await message.answer("У тебя нет команды ...")
         return
-    await add_travel(conn, team)
 
-    if not answer or answer.strip() == '':
-        await processing.edit_text("Здесь ничего нет ...")
+    places = list({match.place.code: match.place for match in matches if match.place}.values())
+    claimed = await claim_visits(redis, team, [place.id for place in places])
+    new_places = [place for place, ok in zip(places, claimed) if ok]
+
+    problems = []
+    for match in matches:
+        if match.code is None:
+            problems.append(f"{match.text} — непонятный код")
+        elif match.place is None:
+            line = f"{match.code[0]}-{match.code[1]} — такой локации не существует"
+            if match.suggestions:
+                line += ". Может быть: " + ", ".join(match.suggestions)
+            problems.append(line)
+    problems.extend(f"{place.code} — вы уже были здесь" for place, ok in zip(places, claimed) if not ok)
+    if len(codes) > MAX_CODES:
+        problems.append(
+            f"Обработаны только первые {MAX_CODES} кодов, остальные {len(codes) - MAX_CODES} отправьте отдельным сообщением"
+        )
+
+    if problems:
+        if len(matches) == 1:
+            # один код — отвечаем как раньше, без префикса
+            text = problems[0].split(" — ", 1)[1]
+            problems = [text[:1].upper() + text[1:]]
+        await message.answer("\n".join(problems), parse_mode=None)
+    if not new_places:
         return
-    
-    header = f"<b>{district} - {number}\n{name}</b>"
-    await processing.edit_text(header)
-
-    parts = re.split(r"(\[[^\]]+\])", answer)
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-
-        if part.startswith("[") and part.endswith("]"):
-            filename = part[1:-1]
-            file_path = os.path.join(MEDIA_ROOT, filename)
-
-            if not os.path.exists(file_path):
-                await message.answer(f" Файл {filename} не найден.")
-                continue
-
-            kind = get_media_type(filename)
-            file = FSInputFile(file_path)
-
-            if kind == "photo":
-                await bot.send_chat_action(message.chat.id, "upload_photo")
-                await message.answer_photo(file)
-            elif kind == "video":
-                await bot.send_chat_action(message.chat.id, "upload_video")
-                await message.answer_video(file)
-            elif kind == "audio":
-                await bot.send_chat_action(message.chat.id, "upload_audio")
-                await message.answer_audio(file)
-
-        else:
-            await bot.send_chat_action(message.chat.id, "typing")
-            await asyncio.sleep(0.8)
-            await message.answer(part)
-
-    await bot.send_chat_action(message.chat.id, "cancel")
-    await redis.sadd(visit_key, place_code)
-
-    if papka:
-        await add_clue(conn, team)
-        admins = await get_admins(conn)
-        for admin_id in admins:
-            try:
-                await bot.send_message(admin_id, f"Команда {team} - папка {papka}")
-            except:
-                pass
 
+    # сами ответы доставит DeliveryWorker, хендлер только ставит задание
+    processing: Message | None = None
+    try:
+        processing = await message.answer("Обработка запроса...")
+        await delivery.enqueue(RevealJob(
+            chat_id=message.chat.id,
+            team=team,
+            place_ids=tuple(place.id for place in new_places),
+            placeholder_id=processing.message_id,
+        ))
+    except Exception:
+        await release_visits(redis, team, [place.id for place in new_places])
+        if processing is not None:
+            with suppress(TelegramAPIError):
+                await processing.edit_text("Не удалось обработать запрос, отправьте код еще раз.")
+        raise
@@ -0,0 +1,13 @@
+from aiogram.filters.callback_data import CallbackData
+
+
+class TagCallback(CallbackData, prefix="t"):
+    id: int
+    page: int = 0
+    nav: bool = False
+
+
+class DistrictCallback(CallbackData, prefix="d"):
+    id: int
+    page: int = 0
+    nav: bool = False
@@ -1,7 +1,17 @@
+from html import escape
+from typing import Any, Callable
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from psycopg import AsyncConnection
 
-from app.infrastructure.database.db import get_districts, get_tags
+from app.bot.keyboards.callbacks import DistrictCallback, TagCallback
+from app.infrastructure.database.catalog import (
+    get_catalog,
+    get_districts,
+    get_places_by_district,
+    get_places_by_tag,
+    get_tags,
+    key_id,
+)
 
 button_adminreg = InlineKeyboardButton(text='ADMIN', callback_data='admin_reg')
 button_usereg = InlineKeyboardButton(text='USER', callback_data='user_reg')
@@ -14,18 +24,92 @@ district_button = InlineKeyboardButton(text='РАЙОНЫ', callback_data='distr
 
 user_start_kb = InlineKeyboardMarkup(inline_keyboard=[[tag_button], [district_button]])
 
-async def make_tags_keyboard(conn: AsyncConnection):
-    tags = await get_tags(conn)
-    tags = [tag if tag is not None else "Без категории" for tag in tags]
-    tags = [tag if tag else "Без категории" for tag in tags]
-    buttons= [InlineKeyboardButton(text=tag, callback_data=f"tag_{tag}")
+NO_TAG = "Без категории"
+
+OUTDATED_TEXT = "Список устарел, откройте его заново - /start"
+
+# запас до лимита в 4096 символов на заголовок страницы
+LISTING_PAGE_LIMIT = 3800
+
+_cache: dict[tuple, Any] = {}
+_cache_version = 0
+
+def _cached(key: tuple, build: Callable[[], Any]) -> Any:
+    # клавиатуры и списки живут, пока не сменилась версия каталога
+    global _cache_version
+    version = get_catalog().version
+    if version != _cache_version:
+        _cache.clear()
+        _cache_version = version
+    if key not in _cache:
+        _cache[key] = build()
+    return _cache[key]
+
+def _build_tags_keyboard():
+    tags = get_tags()
+    buttons= [InlineKeyboardButton(text=tag or NO_TAG, callback_data=TagCallback(id=key_id(tag)).pack())
             for tag in tags]
     keyboard = InlineKeyboardMarkup(inline_keyboard=[buttons[i:i+2] for i in range(0, len(buttons), 2)])
     return keyboard
 
-async def make_district_keyboard(conn: AsyncConnection):
-    districts = await get_districts(conn)
-    buttons = [InlineKeyboardButton(text=district, callback_data=f"district_{district}")
+def _build_district_keyboard():
+    districts = get_districts()
+    buttons = [InlineKeyboardButton(text=district, callback_data=DistrictCallback(id=key_id(district)).pack())
             for district in districts]
     keyboard = InlineKeyboardMarkup(inline_keyboard=[buttons[i:i+3] for i in range(0, len(buttons), 3)])
-    return keyboard
\ No newline at end of file
+    return keyboard
+
+def make_tags_keyboard() -> InlineKeyboardMarkup:
+    return _cached(("tags",), _build_tags_keyboard)
+
+def make_district_keyboard() -> InlineKeyboardMarkup:
+    return _cached(("districts",), _build_district_keyboard)
+
+def _paginate(title: str, rows: list[tuple[str, int, str | None]]) -> list[str]:
+    lines = [f"{district}-{number} {escape(name or '')}" for district, number, name in rows]
+    pages: list[list[str]] = [[]]
+    size = 0
+    for line in lines:
+        if pages[-1] and size + len(line) + 1 > LISTING_PAGE_LIMIT:
+            pages.append([])
+            size = 0
+        pages[-1].append(line)
+        size += len(line) + 1
+
+    header = f"<b>{escape(title)}</b>"
+    if len(pages) == 1:
+        return [f"{header}:\n" + "\n".join(pages[0])]
+    return [
+        f"{header} ({i}/{len(pages)}):\n" + "\n".join(page)
+        for i, page in enumerate(pages, start=1)
+    ]
+
+def _pager(factory: type[TagCallback | DistrictCallback], key: int, page: int, total: int) -> InlineKeyboardMarkup | None:
+    if total <= 1:
+        return None
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton(text="◀", callback_data=factory(id=key, page=page - 1, nav=True).pack()))
+    if page < total - 1:
+        buttons.append(InlineKeyboardButton(text="▶", callback_data=factory(id=key, page=page + 1, nav=True).pack()))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+def _listing_page(factory: type[TagCallback | DistrictCallback], key: int, pages: list[str], page: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    page = min(max(page, 0), len(pages) - 1)
+    return _cached((factory.__prefix__, key, page), lambda: (pages[page], _pager(factory, key, page, len(pages))))
+
+def tag_listing_page(tag_id: int, page: int = 0) -> tuple[str, InlineKeyboardMarkup | None]:
+    tag_ids = get_catalog().tag_ids
+    if tag_id not in tag_ids:
+        return OUTDATED_TEXT, None
+    tag = tag_ids[tag_id]
+    pages = _cached(("tag", tag_id), lambda: _paginate(tag or NO_TAG, get_places_by_tag(tag)))
+    return _listing_page(TagCallback, tag_id, pages, page)
+
+def district_listing_page(district_id: int, page: int = 0) -> tuple[str, InlineKeyboardMarkup | None]:
+    district_ids = get_catalog().district_ids
+    if district_id not in district_ids:
+        return OUTDATED_TEXT, None
+    district = district_ids[district_id]
+    pages = _cached(("district", district_id), lambda: _paginate(district, get_places_by_district(district)))
+    return _listing_page(DistrictCallback, district_id, pages, page)
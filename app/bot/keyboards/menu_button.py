@@ -24,6 +24,14 @@ def get_main_menu_command(user_role: UserRole):
                 command='/visits',
                 description='Посмотреть посещенные командой места /visits <номер команды>'
             ),
+            BotCommand(
+                command='/top',
+                description='Рейтинг команд /top [количество] [очки|места|папки]'
+            ),
+            BotCommand(
+                command='/common',
+                description='Общие места команд /common <номер команды> <номер команды>'
+            ),
             BotCommand(
                 command='/all',
                 description='Написать всем'
@@ -39,6 +47,14 @@ def get_main_menu_command(user_role: UserRole):
             BotCommand(
                 command='/delete_team',
                 description='Удалить команду /delete_team <номер команды>'
+            ),
+            BotCommand(
+                command='/warmup',
+                description='Заранее загрузить медиа в Telegram'
+            ),
+            BotCommand(
+                command='/stats',
+                description='Очередь и ожидание исходящих сообщений'
             )
 
         ]
\ No newline at end of file
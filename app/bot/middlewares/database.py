@@ -5,6 +5,8 @@ from aiogram import BaseMiddleware
 from aiogram.types import Update
 from psycopg_pool import AsyncConnectionPool
 
+from app.infrastructure.database.session import LazyConnection
+
 logger = logging.getLogger(__name__)
 
 class  DataBaseMiddleware(BaseMiddleware):
@@ -20,12 +22,6 @@ class  DataBaseMiddleware(BaseMiddleware):
             logger.error('Database pool is not provided in middleware data')
             raise RuntimeError('Missing db_pool in middleware context')
 
-        async with db_pool.connection() as connection:
-            try:
-                async with connection.transaction():
-                    data['conn'] = connection
-                    result = await handler(event, data)
-            except Exception as e:
-                 logger.exception('Transaction rolled back due to error :%s', e)
-                 raise
-        return result
+        # соединение берется из пула только на время запроса к БД
+        data['conn'] = LazyConnection(db_pool)
+        return await handler(event, data)
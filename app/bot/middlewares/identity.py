@@ -0,0 +1,30 @@
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update, User
+
+from app.infrastructure.cache.users import UserContextCache
+
+logger = logging.getLogger(__name__)
+
+
+class IdentityMiddleware(BaseMiddleware):
+    def __init__(self, cache: UserContextCache):
+        super().__init__()
+        self.cache = cache
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        role, team = (None, None)
+        if user:
+            role, team = await self.cache.get(data["conn"], user.id)
+        data["user_role"] = role
+        data["team"] = team
+        data["user_cache"] = self.cache
+        return await handler(event, data)
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    CopyMessage,
+    EditMessageCaption,
+    EditMessageMedia,
+    EditMessageText,
+    ForwardMessage,
+    SendAnimation,
+    SendAudio,
+    SendDocument,
+    SendLocation,
+    SendMediaGroup,
+    SendMessage,
+    SendPhoto,
+    SendSticker,
+    SendVideo,
+    SendVideoNote,
+    SendVoice,
+    TelegramMethod,
+)
+from aiogram.methods.base import TelegramType
+
+logger = logging.getLogger(__name__)
+
+# лимиты Telegram: ~30 сообщений в секунду на бота, ~1 в секунду в личный чат, 20 в минуту в группу
+GLOBAL_RATE = 25
+GLOBAL_BURST = 25
+CHAT_RATE = 1
+CHAT_BURST = 5
+GROUP_RATE = 20 / 60
+GROUP_BURST = 3
+MAX_RETRIES = 3
+
+# действия, подсказки и служебные вызовы под лимиты сообщений не попадают
+LIMITED_METHODS = (
+    SendMessage,
+    SendPhoto,
+    SendVideo,
+    SendAudio,
+    SendVoice,
+    SendDocument,
+    SendAnimation,
+    SendSticker,
+    SendVideoNote,
+    SendLocation,
+    SendMediaGroup,
+    CopyMessage,
+    ForwardMessage,
+    EditMessageText,
+    EditMessageCaption,
+    EditMessageMedia,
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst and not self._lock.locked()
+
+    async def acquire(self, cost: float = 1) -> None:
+        # asyncio.Lock отдает очередь по порядку — запросы уходят в том же порядке, что пришли
+        async with self._lock:
+            cost = min(cost, self.burst)
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((cost - self.tokens) / self.rate)
+
+
+@dataclass
+class GovernorStats:
+    requests: int = 0
+    waiting: int = 0
+    delayed: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    retry_after: int = 0
+
+    def format(self) -> str:
+        avg = self.total_wait / self.delayed if self.delayed else 0.0
+        return (
+            f"Запросов: {self.requests}\n"
+            f"В очереди: {self.waiting}\n"
+            f"Ждали лимита: {self.delayed}\n"
+            f"Среднее ожидание: {avg:.2f} с\n"
+            f"Максимальное ожидание: {self.max_wait:.2f} с\n"
+            f"Flood control: {self.retry_after}"
+        )
+
+
+class RateGovernor(BaseRequestMiddleware):
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        global_burst: float = GLOBAL_BURST,
+        chat_rate: float = CHAT_RATE,
+        chat_burst: float = CHAT_BURST,
+        group_rate: float = GROUP_RATE,
+        group_burst: float = GROUP_BURST,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_limits = (chat_rate, chat_burst)
+        self.group_limits = (group_rate, group_burst)
+        self.max_retries = max_retries
+        self.stats = GovernorStats()
+        self._chats: dict[int | str, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > 10_000:
+                self._prune()
+            # отрицательный id или @username — группа или канал
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(*(self.group_limits if is_group else self.chat_limits))
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for chat_id in [chat_id for chat_id, bucket in self._chats.items() if bucket.idle(now)]:
+            del self._chats[chat_id]
+
+    async def _acquire(self, method: TelegramMethod) -> None:
+        chat_id = getattr(method, "chat_id", None)
+        cost = len(method.media) if isinstance(method, SendMediaGroup) else 1
+        started = time.monotonic()
+        self.stats.waiting += 1
+        try:
+            if chat_id is not None:
+                await self._chat_bucket(chat_id).acquire(cost)
+            await self.global_bucket.acquire(cost)
+        finally:
+            self.stats.waiting -= 1
+        waited = time.monotonic() - started
+        if waited > 0.01:
+            self.stats.delayed += 1
+            self.stats.total_wait += waited
+            self.stats.max_wait = max(self.stats.max_wait, waited)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        if not isinstance(method, LIMITED_METHODS):
+            return await make_request(bot, method)
+
+        self.stats.requests += 1
+        chat_id = getattr(method, "chat_id", None)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(method)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.stats.retry_after += 1
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(
+                    "[governor] %s to %s: flood control, retry in %s s",
+                    type(method).__name__, chat_id, e.retry_after,
+                )
+                # ждет только тот чат, на который ругнулся Telegram, общий поток не останавливаем
+                bucket = self._chat_bucket(chat_id) if chat_id is not None else self.global_bucket
+                bucket.pause(e.retry_after)
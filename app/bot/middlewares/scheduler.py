@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Hashable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Chat, Update, User
+
+from app.bot.enums.roles import UserRole
+from app.bot.services.notifications import AdminNotifier
+from app.bot.states.states import RegState
+from app.infrastructure.cache.users import UserContextCache
+
+logger = logging.getLogger(__name__)
+
+# пул Postgres — 5 соединений, хендлер держит его только на время запроса
+CONCURRENCY = 8
+REGISTRATION_BACKLOG = 200
+GAMEPLAY_BACKLOG = 1000
+OTHER_BACKLOG = 100
+# список админов держим в памяти: кеш ролей протухает, а админ не должен попасть в общую очередь
+ADMINS_REFRESH = 30
+
+BUSY_TEXT = "Сейчас очень много сообщений, повторите через минуту."
+
+
+class Lane(IntEnum):
+    # меньше значение — выше приоритет
+    ADMIN = 0
+    REGISTRATION = 1
+    GAMEPLAY = 2
+    OTHER = 3
+
+
+LANE_NAMES = {
+    Lane.ADMIN: "админы",
+    Lane.REGISTRATION: "регистрация",
+    Lane.GAMEPLAY: "игра",
+    Lane.OTHER: "прочее",
+}
+
+
+class ChatQueue(BaseMiddleware):
+    # outer-middleware до FSMContextMiddleware: состояние читается, когда прошлый апдейт чата уже обработан
+    def __init__(self):
+        super().__init__()
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self._waiting: dict[Hashable, int] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        chat: Chat | None = data.get("event_chat")
+        user: User | None = data.get("event_from_user")
+        key = chat.id if chat else user.id if user else None
+        if key is None:
+            return await handler(event, data)
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            # asyncio.Lock пускает по порядку — апдейты чата обрабатываются в том порядке, в каком пришли
+            async with lock:
+                return await handler(event, data)
+        finally:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                del self._locks[key]
+
+
+class PrioritySlots:
+    # семафор, который освободившийся слот отдает самой приоритетной очереди, внутри очереди — по порядку
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.busy = 0
+        self._queues: dict[Lane, deque[asyncio.Future]] = {lane: deque() for lane in Lane}
+
+    async def acquire(self, lane: Lane) -> None:
+        if self.busy < self.limit:
+            self.busy += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues[lane]
+        queue.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # слот уже передали нам — передаем дальше
+                self.release()
+            elif future in queue:
+                queue.remove(future)
+            raise
+
+    def release(self) -> None:
+        for lane in Lane:
+            queue = self._queues[lane]
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self.busy -= 1
+
+
+@dataclass
+class LaneStats:
+    handled: int = 0
+    queued: int = 0
+    dropped: int = 0
+    max_wait: float = 0.0
+
+
+@dataclass
+class SchedulerStats:
+    lanes: dict[Lane, LaneStats] = field(default_factory=lambda: {lane: LaneStats() for lane in Lane})
+
+    def format(self) -> str:
+        lines = ["Очереди апдейтов (обработано / ждут / отброшено / макс. ожидание):"]
+        for lane, stats in self.lanes.items():
+            lines.append(
+                f"{LANE_NAMES[lane]}: {stats.handled} / {stats.queued} / {stats.dropped} / {stats.max_wait:.2f} с"
+            )
+        return "\n".join(lines)
+
+
+class UpdateScheduler(BaseMiddleware):
+    # стоит до IdentityMiddleware: очередь выбирается только по кешу ролей, запрос в Postgres — уже внутри слота
+    def __init__(
+        self,
+        cache: UserContextCache,
+        notifier: AdminNotifier,
+        concurrency: int = CONCURRENCY,
+        registration_backlog: int = REGISTRATION_BACKLOG,
+        gameplay_backlog: int = GAMEPLAY_BACKLOG,
+        other_backlog: int = OTHER_BACKLOG,
+        admins_refresh: float = ADMINS_REFRESH,
+    ):
+        super().__init__()
+        self.cache = cache
+        self.notifier = notifier
+        self.admins_refresh = admins_refresh
+        self.admins: frozenset[int] = frozenset()
+        self.slots = PrioritySlots(concurrency)
+        # не ограничиваем и не отбрасываем только админов
+        self.backlogs = {
+            Lane.REGISTRATION: registration_backlog,
+            Lane.GAMEPLAY: gameplay_backlog,
+            Lane.OTHER: other_backlog,
+        }
+        self.stats = SchedulerStats()
+
+    async def load_admins(self) -> None:
+        self.admins = frozenset(await self.notifier.get_admins())
+
+    async def watch_admins(self) -> None:
+        while True:
+            await asyncio.sleep(self.admins_refresh)
+            try:
+                await self.load_admins()
+            except Exception:
+                logger.exception("[scheduler] admins refresh failed")
+
+    async def classify(self, event: Update, data: dict[str, Any]) -> Lane:
+        user: User | None = data.get("event_from_user")
+        if user and user.id in self.admins:
+            return Lane.ADMIN
+        ctx = await self.cache.peek(user.id) if user else None
+        if ctx is not None and ctx[0] == UserRole.ADMIN:
+            # только что зарегистрированный админ, до следующего обновления списка
+            return Lane.ADMIN
+        raw_state = data.get("raw_state")
+        if raw_state and raw_state in RegState:
+            # выше игры только уже начатая регистрация
+            return Lane.REGISTRATION
+        if ctx is not None and ctx[0] is None:
+            # незарегистрированные не должны вытеснять команды
+            return Lane.OTHER
+        if event.message and not event.message.text:
+            # стикеры, фото и прочее уходят в эхо
+            return Lane.OTHER
+        # роли нет в кеше — считаем игроком, IdentityMiddleware сходит в базу уже внутри слота
+        return Lane.GAMEPLAY
+
+    async def _reject(self, event: Update, lane: Lane) -> None:
+        self.stats.lanes[lane].dropped += 1
+        logger.warning("[scheduler] %s lane is full, update %s dropped", lane.name.lower(), event.update_id)
+        if lane != Lane.OTHER and event.message:
+            try:
+                await event.message.answer(BUSY_TEXT)
+            except Exception:
+                logger.exception("[scheduler] busy reply failed")
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        lane = await self.classify(event, data)
+        stats = self.stats.lanes[lane]
+        backlog = self.backlogs.get(lane)
+        if backlog is not None and stats.queued >= backlog:
+            await self._reject(event, lane)
+            return None
+
+        started = time.monotonic()
+        stats.queued += 1
+        try:
+            await self.slots.acquire(lane)
+        finally:
+            stats.queued -= 1
+        stats.max_wait = max(stats.max_wait, time.monotonic() - started)
+        try:
+            return await handler(event, data)
+        finally:
+            stats.handled += 1
+            self.slots.release()
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from psycopg_pool import AsyncConnectionPool
+
+from app.infrastructure.database.db import get_users
+
+logger = logging.getLogger(__name__)
+
+# темп задает RateGovernor в сессии бота, здесь только число параллельных отправок
+BROADCAST_CONCURRENCY = 8
+MAX_ATTEMPTS = 4
+PROGRESS_INTERVAL = 5.0
+
+
+@dataclass
+class BroadcastStats:
+    total: int = 0
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    retried: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    def format(self, title: str) -> str:
+        return (
+            f"{title}: {self.done}/{self.total}\n"
+            f"Доставлено: {self.sent}\n"
+            f"Заблокировали бота: {self.blocked}\n"
+            f"Ошибки: {self.failed}\n"
+            f"Повторы: {self.retried}\n"
+            f"Время: {time.monotonic() - self.started_at:.0f} с"
+        )
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        bot: Bot,
+        pool: AsyncConnectionPool,
+        concurrency: int = BROADCAST_CONCURRENCY,
+    ):
+        self.bot = bot
+        self.pool = pool
+        self.concurrency = concurrency
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self, admin_chat_id: int, from_chat_id: int, message_id: int) -> asyncio.Task:
+        task = asyncio.create_task(
+            self._run(admin_chat_id, from_chat_id, message_id),
+            name=f"broadcast-{message_id}",
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("[broadcast] %s failed", task.get_name(), exc_info=task.exception())
+
+    async def _send(self, user_id: int, from_chat_id: int, message_id: int, stats: BroadcastStats) -> None:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                # copy_message переносит любой тип сообщения вместе с подписью
+                await self.bot.copy_message(user_id, from_chat_id, message_id)
+                stats.sent += 1
+                return
+            except TelegramRetryAfter as e:
+                # сессия уже повторила несколько раз — отложим этого получателя подольше
+                logger.warning("[broadcast] flood control for user %s, sleeping %s s", user_id, e.retry_after)
+                await asyncio.sleep(e.retry_after)
+            except TelegramForbiddenError:
+                stats.blocked += 1
+                return
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logger.debug("[broadcast] user %s attempt %d failed: %s", user_id, attempt, e)
+                await asyncio.sleep(2 ** attempt)
+            except TelegramAPIError as e:
+                logger.warning("[broadcast] user %s failed: %s", user_id, e)
+                stats.failed += 1
+                return
+            if attempt < MAX_ATTEMPTS:
+                stats.retried += 1
+        stats.failed += 1
+
+    async def _worker(self, queue: asyncio.Queue, from_chat_id: int, message_id: int, stats: BroadcastStats) -> None:
+        while True:
+            user_id = await queue.get()
+            try:
+                await self._send(user_id, from_chat_id, message_id, stats)
+            finally:
+                queue.task_done()
+
+    async def _report(self, admin_chat_id: int, status_id: int, stats: BroadcastStats) -> None:
+        last = None
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            text = stats.format("Рассылка")
+            if text == last:
+                continue
+            with suppress(TelegramAPIError):
+                await self.bot.edit_message_text(text, chat_id=admin_chat_id, message_id=status_id)
+            last = text
+
+    async def _run(self, admin_chat_id: int, from_chat_id: int, message_id: int) -> BroadcastStats:
+        # соединение берем только на выборку получателей, не на всю рассылку
+        async with self.pool.connection() as conn:
+            users = await get_users(conn)
+        stats = BroadcastStats(total=len(users))
+        status = await self.bot.send_message(admin_chat_id, stats.format("Рассылка"))
+
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for user_id in users:
+            queue.put_nowait(user_id)
+        workers = [
+            asyncio.create_task(self._worker(queue, from_chat_id, message_id, stats))
+            for _ in range(min(self.concurrency, len(users)))
+        ]
+        reporter = asyncio.create_task(self._report(admin_chat_id, status.message_id, stats))
+        try:
+            await queue.join()
+        finally:
+            for task in (*workers, reporter):
+                task.cancel()
+            await asyncio.gather(*workers, reporter, return_exceptions=True)
+
+        logger.info(
+            "[broadcast] done: sent=%d blocked=%d failed=%d total=%d",
+            stats.sent, stats.blocked, stats.failed, stats.total,
+        )
+        with suppress(TelegramAPIError):
+            await self.bot.edit_message_text(
+                stats.format("Рассылка завершена"), chat_id=admin_chat_id, message_id=status.message_id
+            )
+        return stats
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
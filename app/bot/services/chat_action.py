@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, suppress
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+# Telegram показывает действие ~5 секунд, обновляем чуть раньше
+ACTION_TTL = 4.5
+
+
+class ChatActionManager:
+    def __init__(self, bot: Bot, ttl: float = ACTION_TTL):
+        self.bot = bot
+        self.ttl = ttl
+        self._sent_at: dict[int, float] = {}
+
+    async def send(self, chat_id: int, action: str) -> None:
+        now = time.monotonic()
+        if now - self._sent_at.get(chat_id, 0.0) < self.ttl:
+            return
+        self._sent_at[chat_id] = now
+        if len(self._sent_at) > 10_000:
+            self._prune(now)
+        try:
+            await self.bot.send_chat_action(chat_id, action)
+        except TelegramAPIError as e:
+            logger.debug("[chat_action] %s for chat %s failed: %s", action, chat_id, e)
+
+    async def _refresh(self, chat_id: int, action: str) -> None:
+        while True:
+            await asyncio.sleep(self.ttl)
+            await self.send(chat_id, action)
+
+    @asynccontextmanager
+    async def action(self, chat_id: int, action: str):
+        await self.send(chat_id, action)
+        task = asyncio.create_task(self._refresh(chat_id, action))
+        try:
+            yield
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def _prune(self, now: float) -> None:
+        stale = [chat_id for chat_id, sent_at in self._sent_at.items() if now - sent_at >= self.ttl]
+        for chat_id in stale:
+            del self._sent_at[chat_id]
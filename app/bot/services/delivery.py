@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.types import FSInputFile, InputMediaAudio, InputMediaPhoto, InputMediaVideo
+
+from app.bot.services.chat_action import ChatActionManager
+from app.infrastructure.media.plan import MediaGroup, MediaSegment, Segment
+from app.infrastructure.media.registry import MediaRegistry
+
+logger = logging.getLogger(__name__)
+
+TEXT_DELAY = 0.8
+
+INPUT_MEDIA = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "audio": InputMediaAudio,
+}
+
+CHAT_ACTIONS = {
+    "photo": "upload_photo",
+    "video": "upload_video",
+    "audio": "upload_voice",
+}
+
+
+async def send_media(
+    bot: Bot,
+    chat_id: int,
+    segment: MediaSegment,
+    registry: MediaRegistry,
+    chat_actions: ChatActionManager,
+) -> None:
+    file = await registry.resolve(segment.path)
+
+    async with chat_actions.action(chat_id, CHAT_ACTIONS[segment.kind]):
+        if segment.kind == "photo":
+            sent = await bot.send_photo(chat_id, file)
+        elif segment.kind == "video":
+            sent = await bot.send_video(chat_id, file)
+        else:
+            sent = await bot.send_audio(chat_id, file)
+
+    if isinstance(file, FSInputFile):
+        await registry.remember(segment.path, sent)
+
+
+async def send_media_group(
+    bot: Bot,
+    chat_id: int,
+    group: MediaGroup,
+    registry: MediaRegistry,
+    chat_actions: ChatActionManager,
+) -> None:
+    files = [await registry.resolve(item.path) for item in group.items]
+    media = [INPUT_MEDIA[item.kind](media=file) for item, file in zip(group.items, files)]
+
+    async with chat_actions.action(chat_id, CHAT_ACTIONS[group.items[0].kind]):
+        sent = await bot.send_media_group(chat_id, media)
+
+    for item, file, sent_message in zip(group.items, files, sent):
+        if isinstance(file, FSInputFile):
+            await registry.remember(item.path, sent_message)
+
+
+async def deliver_plan(
+    bot: Bot,
+    chat_id: int,
+    plan: tuple[Segment, ...],
+    registry: MediaRegistry,
+    chat_actions: ChatActionManager,
+) -> None:
+    for segment in plan:
+        if isinstance(segment, MediaGroup):
+            await send_media_group(bot, chat_id, segment, registry, chat_actions)
+        elif isinstance(segment, MediaSegment):
+            await send_media(bot, chat_id, segment, registry, chat_actions)
+        else:
+            await chat_actions.send(chat_id, "typing")
+            await asyncio.sleep(TEXT_DELAY)
+            await bot.send_message(chat_id, segment.text)
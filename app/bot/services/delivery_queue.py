@@ -0,0 +1,131 @@
+import logging
+from dataclasses import dataclass
+
+from aiogram import Bot
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from app.bot.services.chat_action import ChatActionManager
+from app.bot.services.delivery import deliver_plan
+from app.bot.services.notifications import AdminNotifier
+from app.infrastructure.database.catalog import Place, get_catalog
+from app.infrastructure.game.counters import TeamCounters
+from app.infrastructure.game.history import VisitHistory
+from app.infrastructure.game.visits import release_visits
+from app.infrastructure.media.registry import MediaRegistry
+from app.infrastructure.streams.consumer import StreamConsumer
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "delivery:jobs"
+GROUP = "delivery"
+# сколько мест задания уже доставлено: после рестарта продолжаем с того же места
+PROGRESS_KEY = "delivery:progress"
+
+STREAM_MAXLEN = 10_000
+# задание дольше этого без ack считается брошенным упавшим процессом
+CLAIM_IDLE_MS = 10 * 60 * 1000
+DELIVERY_CONCURRENCY = 16
+
+
+@dataclass(frozen=True, slots=True)
+class RevealJob:
+    chat_id: int
+    team: int
+    place_ids: tuple[int, ...]
+    placeholder_id: int | None = None
+
+    def to_fields(self) -> dict[str, str]:
+        return {
+            "chat_id": str(self.chat_id),
+            "team": str(self.team),
+            "places": ",".join(map(str, self.place_ids)),
+            "placeholder_id": str(self.placeholder_id or ""),
+        }
+
+    @classmethod
+    def from_fields(cls, fields: dict[str, str]) -> "RevealJob":
+        return cls(
+            chat_id=int(fields["chat_id"]),
+            team=int(fields["team"]),
+            place_ids=tuple(int(place_id) for place_id in fields["places"].split(",") if place_id),
+            placeholder_id=int(fields["placeholder_id"]) if fields.get("placeholder_id") else None,
+        )
+
+
+class DeliveryWorker(StreamConsumer):
+    def __init__(
+        self,
+        bot: Bot,
+        redis: Redis,
+        registry: MediaRegistry,
+        chat_actions: ChatActionManager,
+        counters: TeamCounters,
+        history: VisitHistory,
+        notifier: AdminNotifier,
+        consumer: str = "main",
+        concurrency: int = DELIVERY_CONCURRENCY,
+        stream: str = STREAM_KEY,
+    ):
+        super().__init__(redis, stream, GROUP, consumer, concurrency, CLAIM_IDLE_MS)
+        self.bot = bot
+        self.registry = registry
+        self.chat_actions = chat_actions
+        self.counters = counters
+        self.history = history
+        self.notifier = notifier
+
+    async def enqueue(self, job: RevealJob) -> str:
+        return await self.redis.xadd(self.stream, job.to_fields(), maxlen=STREAM_MAXLEN, approximate=True)
+
+    def parse(self, fields: dict[str, str]) -> tuple[int, RevealJob]:
+        # один чат — одно задание за раз, в порядке чтения из потока
+        job = RevealJob.from_fields(fields)
+        return job.chat_id, job
+
+    def on_ack(self, pipe: Pipeline, entry_id: str) -> None:
+        pipe.hdel(PROGRESS_KEY, entry_id)
+
+    async def _after_visit(self, job: RevealJob, place: Place) -> None:
+        # место уже засчитано — сбой здесь не должен его освобождать
+        try:
+            await self.history.record(job.team, [place])
+        except Exception:
+            logger.exception("[delivery] history for team %s, place %s was not recorded", job.team, place.code)
+        if place.papka:
+            try:
+                await self.notifier.notify(f"Команда {job.team} — папка {place.papka}")
+            except Exception:
+                logger.exception("[delivery] notification for team %s, place %s was not sent", job.team, place.code)
+
+    async def process(self, entry_id: str, job: RevealJob) -> None:
+        catalog = get_catalog()
+        done = int(await self.redis.hget(PROGRESS_KEY, entry_id) or 0)
+        try:
+            for index in range(done, len(job.place_ids)):
+                place = catalog.places_by_id.get(job.place_ids[index])
+                if place is None:
+                    # место пропало из каталога, пока задание ждало в очереди
+                    await release_visits(self.redis, job.team, [job.place_ids[index]])
+                else:
+                    header = f"<b>{place.district} - {place.number}\n{place.name}</b>"
+                    if not place.plan:
+                        header += "\nЗдесь ничего нет ..."
+                    if index == 0 and job.placeholder_id:
+                        await self.bot.edit_message_text(header, chat_id=job.chat_id, message_id=job.placeholder_id)
+                    else:
+                        await self.bot.send_message(job.chat_id, header)
+                    await deliver_plan(self.bot, job.chat_id, place.plan, self.registry, self.chat_actions)
+                # очки и прогресс — одной транзакцией: засчитанное место не освободится и не засчитается дважды
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    if place is not None:
+                        self.counters.stage_visits(pipe, job.team, visits=1, clues=1 if place.papka else 0)
+                    pipe.hincrby(PROGRESS_KEY, entry_id, 1)
+                    await pipe.execute()
+                done = index + 1
+                if place is not None:
+                    await self._after_visit(job, place)
+        except Exception:
+            logger.exception("[delivery] job %s for chat %s failed at %d/%d", entry_id, job.chat_id, done, len(job.place_ids))
+            # недоставленные места команда сможет открыть заново
+            await release_visits(self.redis, job.team, list(job.place_ids[done:]))
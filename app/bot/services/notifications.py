@@ -0,0 +1,102 @@
+import asyncio
+import json
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from psycopg_pool import AsyncConnectionPool
+from redis.asyncio import Redis
+
+from app.infrastructure.database.db import get_admins
+from app.infrastructure.media.plan import split_text
+
+logger = logging.getLogger(__name__)
+
+# события пишут все процессы, дайджест рассылает только ведущий
+EVENTS_KEY = "notify:events"
+ADMINS_KEY = "notify:admins"
+
+# события за это окно уходят админам одним сообщением
+DIGEST_WINDOW = 3.0
+POLL_INTERVAL = 0.5
+ADMINS_TTL = 60
+
+
+class AdminNotifier:
+    def __init__(
+        self,
+        bot: Bot,
+        redis: Redis,
+        pool: AsyncConnectionPool,
+        window: float = DIGEST_WINDOW,
+        admins_ttl: int = ADMINS_TTL,
+    ):
+        self.bot = bot
+        self.redis = redis
+        self.pool = pool
+        self.window = window
+        self.admins_ttl = admins_ttl
+        self._pending: list[str] = []
+
+    async def notify(self, text: str) -> None:
+        # ни базы, ни Telegram не ждет — разошлет фоновая задача ведущего процесса
+        await self.redis.rpush(EVENTS_KEY, text)
+
+    async def invalidate_admins(self) -> None:
+        await self.redis.delete(ADMINS_KEY)
+
+    async def get_admins(self) -> list[int]:
+        cached = await self.redis.get(ADMINS_KEY)
+        if cached is not None:
+            return json.loads(cached)
+        async with self.pool.connection() as conn:
+            admins = await get_admins(conn)
+        await self.redis.set(ADMINS_KEY, json.dumps(admins), ex=self.admins_ttl)
+        return admins
+
+    async def _take(self) -> list[str]:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(EVENTS_KEY, 0, -1)
+            pipe.delete(EVENTS_KEY)
+            events, _ = await pipe.execute()
+        return events
+
+    async def _collect(self) -> list[str]:
+        # собранное держим в self._pending, чтобы при остановке ничего не потерять
+        while not self._pending:
+            self._pending.extend(await self._take())
+            if not self._pending:
+                await asyncio.sleep(POLL_INTERVAL)
+        await asyncio.sleep(self.window)
+        self._pending.extend(await self._take())
+        events, self._pending = self._pending, []
+        return events
+
+    async def _drain(self) -> list[str]:
+        events, self._pending = self._pending, []
+        return events + await self._take()
+
+    async def send_digest(self, events: list[str]) -> None:
+        if not events:
+            return
+        admins = await self.get_admins()
+        chunks = split_text("\n".join(events))
+        for admin_id in admins:
+            try:
+                for chunk in chunks:
+                    await self.bot.send_message(admin_id, chunk, parse_mode=None)
+            except TelegramAPIError as e:
+                logger.warning("[notify] admin %s: %s", admin_id, e)
+        logger.debug("[notify] %d events sent to %d admins", len(events), len(admins))
+
+    async def run(self) -> None:
+        try:
+            while True:
+                events = await self._collect()
+                try:
+                    await self.send_digest(events)
+                except Exception:
+                    logger.exception("[notify] digest failed")
+        except asyncio.CancelledError:
+            await self.send_digest(await self._drain())
+            raise
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from html import escape
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from redis.asyncio import Redis
+
+from app.infrastructure.game.leaderboard import Leaderboard
+
+logger = logging.getLogger(__name__)
+
+TOP_LIMIT = 10
+
+
+def format_top(rows: list[tuple[int, int, int, int]], title: str = "Рейтинг команд") -> str:
+    if not rows:
+        return f"<b>{escape(title)}</b>\nПока никто ничего не посетил"
+    lines = [
+        f"{place}. Команда {team} — {score} (мест: {travels}, папок: {clues})"
+        for place, (team, travels, clues, score) in enumerate(rows, start=1)
+    ]
+    return f"<b>{escape(title)}</b>\n" + "\n".join(lines)
+
+
+def pinned_key(chat_id: int) -> str:
+    return f"leaderboard:pinned:{chat_id}"
+
+
+class PinnedLeaderboard:
+    def __init__(
+        self,
+        bot: Bot,
+        redis: Redis,
+        leaderboard: Leaderboard,
+        chat_id: int,
+        interval: float = 60.0,
+        limit: int = TOP_LIMIT,
+    ):
+        self.bot = bot
+        self.redis = redis
+        self.leaderboard = leaderboard
+        self.chat_id = chat_id
+        self.interval = interval
+        self.limit = limit
+        self._last_text: str | None = None
+
+    async def _post(self, text: str) -> None:
+        message = await self.bot.send_message(self.chat_id, text)
+        await self.redis.set(pinned_key(self.chat_id), message.message_id)
+        try:
+            await self.bot.pin_chat_message(self.chat_id, message.message_id, disable_notification=True)
+        except TelegramAPIError as e:
+            logger.warning("[leaderboard] can't pin in chat %s: %s", self.chat_id, e)
+
+    async def refresh(self) -> None:
+        text = format_top(await self.leaderboard.top(self.limit))
+        if text == self._last_text:
+            return
+        message_id = await self.redis.get(pinned_key(self.chat_id))
+        if message_id is None:
+            await self._post(text)
+        else:
+            try:
+                await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=int(message_id))
+            except TelegramBadRequest as e:
+                if "message is not modified" not in e.message:
+                    # сообщение удалили или оно стало недоступно — публикуем заново
+                    logger.info("[leaderboard] pinned message is gone (%s), posting a new one", e.message)
+                    await self._post(text)
+        self._last_text = text
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("[leaderboard] refresh failed")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from contextlib import suppress
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+from app.infrastructure.media.registry import MediaRegistry
+from app.infrastructure.media.warmup import WarmupResult, warmup_media
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 5.0
+
+
+class MediaWarmer:
+    # /warmup идет фоном, как рассылка: хендлер не держит ни слот планировщика, ни очередь чата
+    def __init__(self, bot: Bot, registry: MediaRegistry, stash_chat_id: int | None, concurrency: int):
+        self.bot = bot
+        self.registry = registry
+        self.stash_chat_id = stash_chat_id
+        self.concurrency = concurrency
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, admin_chat_id: int) -> asyncio.Task:
+        self._task = asyncio.create_task(self._run(admin_chat_id), name="media-warmup-command")
+        self._task.add_done_callback(self._done)
+        return self._task
+
+    def _done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            logger.error("[warmup] %s failed", task.get_name(), exc_info=task.exception())
+
+    async def _report(self, admin_chat_id: int, status_id: int, result: WarmupResult) -> None:
+        last = None
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            text = result.format("Загрузка медиа")
+            if text == last:
+                continue
+            with suppress(TelegramAPIError):
+                await self.bot.edit_message_text(text, chat_id=admin_chat_id, message_id=status_id, parse_mode=None)
+            last = text
+
+    async def _run(self, admin_chat_id: int) -> WarmupResult:
+        result = WarmupResult()
+        status = await self.bot.send_message(admin_chat_id, "Загружаю медиа...")
+        reporter = asyncio.create_task(self._report(admin_chat_id, status.message_id, result))
+        try:
+            await warmup_media(self.bot, self.registry, self.stash_chat_id, self.concurrency, result=result)
+        finally:
+            reporter.cancel()
+            await asyncio.gather(reporter, return_exceptions=True)
+        with suppress(TelegramAPIError):
+            await self.bot.edit_message_text(
+                result.format("Загрузка медиа завершена"),
+                chat_id=admin_chat_id,
+                message_id=status.message_id,
+                parse_mode=None,
+            )
+        return result
+
+    async def shutdown(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config.config import WebhookSettings
+
+logger = logging.getLogger(__name__)
+
+
+def build_webhook_app(
+    dp: Dispatcher,
+    bot: Bot,
+    settings: WebhookSettings,
+    handle_in_background: bool = True,
+) -> web.Application:
+    app = web.Application()
+    # по умолчанию отвечаем Telegram сразу, апдейт обрабатывается фоном
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=handle_in_background,
+        secret_token=settings.secret,
+    ).register(app, path=settings.path)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(
+    dp: Dispatcher,
+    bot: Bot,
+    settings: WebhookSettings,
+    handle_in_background: bool = True,
+    **workflow_data,
+) -> None:
+    dp.workflow_data.update(workflow_data)
+    app = build_webhook_app(dp, bot, settings, handle_in_background)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.host, settings.port)
+    await site.start()
+    logger.info("[webhook] listening on %s:%s%s", settings.host, settings.port, settings.path)
+
+    try:
+        await bot.set_webhook(
+            url=settings.url.rstrip("/") + settings.path,
+            secret_token=settings.secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=False,
+        )
+        logger.info("[webhook] set to %s%s", settings.url.rstrip("/"), settings.path)
+        await asyncio.Event().wait()
+    finally:
+        try:
+            await bot.delete_webhook()
+            logger.info("[webhook] deleted")
+        except Exception:
+            logger.exception("[webhook] delete failed")
+        await runner.cleanup()
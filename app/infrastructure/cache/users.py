@@ -0,0 +1,111 @@
+import logging
+
+from cachetools import TTLCache
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from app.bot.enums.roles import UserRole
+from app.infrastructure.database.db import get_user_context
+from app.infrastructure.database.session import LazyConnection
+
+logger = logging.getLogger(__name__)
+
+UserContext = tuple[UserRole | None, int | None]
+
+
+def user_context_key(user_id: int) -> str:
+    return f"user:{user_id}:ctx"
+
+
+# растет при каждой инвалидации: прочитанное из базы до нее в кеш уже не попадет
+def user_version_key(user_id: int) -> str:
+    return f"user:{user_id}:ctx:ver"
+
+
+INVALIDATE_CHANNEL = "user:ctx:invalidate"
+VERSION_TTL = 24 * 60 * 60
+
+
+class UserContextCache:
+    def __init__(
+        self,
+        redis: Redis,
+        local_ttl: float = 30,
+        redis_ttl: int = 600,
+        maxsize: int = 10_000,
+    ):
+        self.redis = redis
+        self.redis_ttl = redis_ttl
+        self._local: TTLCache[int, UserContext] = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        # счетчик полученных инвалидаций: ответ, начатый до нее, в локальный кеш не кладем
+        self._generation = 0
+
+    def _remember(self, user_id: int, ctx: UserContext, generation: int) -> None:
+        if generation == self._generation:
+            self._local[user_id] = ctx
+
+    async def peek(self, user_id: int) -> UserContext | None:
+        # только кеши, без Postgres: None — пользователя в кеше нет
+        ctx = self._local.get(user_id)
+        if ctx is not None:
+            return ctx
+
+        generation = self._generation
+        cached = await self.redis.hgetall(user_context_key(user_id))
+        if not cached:
+            return None
+        # пустая строка — закешированное «нет роли / нет команды»
+        role, team = cached.get("role"), cached.get("team")
+        ctx = (UserRole(role) if role else None), (int(team) if team else None)
+        self._remember(user_id, ctx, generation)
+        return ctx
+
+    async def get(self, conn: LazyConnection, user_id: int) -> UserContext:
+        ctx = await self.peek(user_id)
+        if ctx is not None:
+            return ctx
+
+        generation = self._generation
+        version = await self.redis.get(user_version_key(user_id))
+        ctx = await get_user_context(conn.reader(), user_id=user_id)
+        if await self._store(user_id, ctx, version):
+            self._remember(user_id, ctx, generation)
+        return ctx
+
+    async def _store(self, user_id: int, ctx: UserContext, version: str | None) -> bool:
+        role, team = ctx
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(user_version_key(user_id))
+                if await pipe.get(user_version_key(user_id)) != version:
+                    # пока читали базу, пользователя инвалидировали
+                    return False
+                pipe.multi()
+                pipe.hset(
+                    user_context_key(user_id),
+                    mapping={"role": role.value if role else "", "team": team if team is not None else ""},
+                )
+                pipe.expire(user_context_key(user_id), self.redis_ttl)
+                await pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    async def invalidate(self, user_id: int) -> None:
+        self._local.pop(user_id, None)
+        self._generation += 1
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(user_version_key(user_id))
+            pipe.expire(user_version_key(user_id), VERSION_TTL)
+            pipe.delete(user_context_key(user_id))
+            # локальные кеши остальных процессов чистит listen()
+            pipe.publish(INVALIDATE_CHANNEL, user_id)
+            await pipe.execute()
+
+    async def listen(self) -> None:
+        async with self.redis.pubsub() as pubsub:
+            await pubsub.subscribe(INVALIDATE_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self._generation += 1
+                    self._local.pop(int(message["data"]), None)
@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import os
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from psycopg_pool import AsyncConnectionPool
+
+from app.infrastructure.database.search import SearchIndex
+from app.infrastructure.media.plan import MEDIA_ROOT, Segment, compile_answer, iter_media_refs
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Place:
+    # слот из place_slots, а не places.id: постоянный для кода места и плотный
+    id: int
+    tag: str | None
+    district: str
+    number: int
+    name: str | None
+    answer: str | None
+    papka: int | None
+    plan: tuple[Segment, ...] = ()
+
+    @property
+    def code(self) -> str:
+        return f"{self.district}-{self.number}"
+
+
+@dataclass(frozen=True, slots=True)
+class Catalog:
+    version: int = 0
+    fingerprint: str = ""
+    places: dict[tuple[str, int], Place] = field(default_factory=dict)
+    tags: tuple[str | None, ...] = ()
+    districts: tuple[str, ...] = ()
+    by_tag: dict[str | None, tuple[Place, ...]] = field(default_factory=dict)
+    by_district: dict[str, tuple[Place, ...]] = field(default_factory=dict)
+    places_by_id: dict[int, Place] = field(default_factory=dict)
+    tag_ids: dict[int, str | None] = field(default_factory=dict)
+    district_ids: dict[int, str] = field(default_factory=dict)
+    search: SearchIndex = field(default_factory=SearchIndex)
+
+
+def key_id(value: str | None) -> int:
+    # короткий и стабильный между импортами и перезапусками id для callback_data
+    return zlib.crc32((value or "").encode())
+
+
+def _key_ids(names: Iterable[str | None]) -> dict[int, Any]:
+    ids: dict[int, Any] = {}
+    for name in names:
+        other = ids.setdefault(key_id(name), name)
+        if other != name:
+            # кнопки одного из них открывали бы чужой список — такой каталог не принимаем
+            raise ValueError(f"callback id collision between {other!r} and {name!r}, rename one of them")
+    return ids
+
+
+def _tag_key(tag: str | None):
+    # как ORDER BY tag в Postgres: NULL в конце
+    return (tag is None, tag or "")
+
+
+def fingerprint_rows(rows: Iterable[tuple[Any, ...]]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for row in sorted(rows, key=repr):
+        digest.update(repr(row).encode())
+        # появившийся или пропавший файл тоже меняет план ответа
+        for filename in iter_media_refs(row[5]):
+            digest.update(b"+" if os.path.exists(os.path.join(MEDIA_ROOT, filename)) else b"-")
+    return digest.hexdigest()
+
+
+def build_catalog(rows: Iterable[tuple[Any, ...]], version: int, fingerprint: str = "") -> Catalog:
+    places: dict[tuple[str, int], Place] = {}
+    for place_id, tag, district, number, name, answer, papka in rows:
+        if district is None or number is None:
+            continue
+        tag = tag or None
+        plan, problems = compile_answer(answer)
+        for problem in problems:
+            logger.warning("[catalog] %s-%s: %s", district, number, problem)
+        places[(district, number)] = Place(place_id, tag, district, number, name, answer, papka, plan)
+
+    ordered = sorted(places.values(), key=lambda p: (p.district, p.number))
+    by_tag: dict[str | None, list[Place]] = {}
+    by_district: dict[str, list[Place]] = {}
+    for place in ordered:
+        by_tag.setdefault(place.tag, []).append(place)
+        by_district.setdefault(place.district, []).append(place)
+
+    tag_ids = _key_ids(by_tag)
+    district_ids = _key_ids(by_district)
+
+    return Catalog(
+        version=version,
+        fingerprint=fingerprint,
+        places=places,
+        tags=tuple(sorted(by_tag, key=_tag_key)),
+        districts=tuple(sorted(by_district)),
+        by_tag={tag: tuple(items) for tag, items in by_tag.items()},
+        by_district={district: tuple(items) for district, items in by_district.items()},
+        places_by_id={place.id: place for place in places.values()},
+        tag_ids=tag_ids,
+        district_ids=district_ids,
+        search=SearchIndex(ordered),
+    )
+
+
+_catalog = Catalog()
+
+
+def get_catalog() -> Catalog:
+    return _catalog
+
+
+async def load_catalog(pool: AsyncConnectionPool, assign_slots: bool = False) -> Catalog:
+    # db.py тянет app.bot, а тот при загрузке импортирует каталог
+    from app.infrastructure.database.db import assign_place_slots, get_places, set_catalog_fingerprint
+
+    global _catalog
+    async with pool.connection() as conn:
+        # слоты раздают только ведущий и импорт: LOCK TABLE place_slots не нужен каждому воркеру
+        if assign_slots and (assigned := await assign_place_slots(conn)):
+            logger.info("[catalog] assigned %d new place slots", assigned)
+        rows = await get_places(conn)
+        fingerprint = fingerprint_rows(rows)
+        if assign_slots:
+            await set_catalog_fingerprint(conn, fingerprint)
+    if _catalog.version and fingerprint == _catalog.fingerprint:
+        logger.info("[catalog] places unchanged, keeping version=%d", _catalog.version)
+        return _catalog
+    # собираем новый каталог целиком и только потом подменяем ссылку
+    _catalog = build_catalog(rows, version=_catalog.version + 1, fingerprint=fingerprint)
+    logger.info("[catalog] loaded version=%d places=%d", _catalog.version, len(_catalog.places))
+    return _catalog
+
+
+_published: str | None = None
+
+
+async def refresh_catalog(pool: AsyncConnectionPool) -> Catalog:
+    # остальные процессы читают одну строку и перечитывают места, только если ведущий опубликовал новый каталог
+    from app.infrastructure.database.db import get_catalog_fingerprint
+
+    global _published
+    async with pool.connection() as conn:
+        published = await get_catalog_fingerprint(conn)
+    if _catalog.version and published in (None, _published):
+        return _catalog
+    catalog = await load_catalog(pool)
+    _published = published
+    return catalog
+
+
+def get_place(district: str, number: int) -> Place | None:
+    return _catalog.places.get((district, number))
+
+
+def search_places(query: str, limit: int = 50) -> list[Place]:
+    return [_catalog.places_by_id[place_id] for place_id in _catalog.search.search(query, limit)]
+
+
+def get_tags() -> list[str | None]:
+    return list(_catalog.tags)
+
+
+def get_districts() -> list[str]:
+    return list(_catalog.districts)
+
+
+def get_places_by_tag(tag: str | None) -> list[tuple[str, int, str | None]]:
+    return [(p.district, p.number, p.name) for p in _catalog.by_tag.get(tag, ())]
+
+
+def get_places_by_district(district: str) -> list[tuple[str, int, str | None]]:
+    return [(p.district, p.number, p.name) for p in _catalog.by_district.get(district, ())]
@@ -78,6 +78,25 @@ async def get_user_role(
     #     logger.warning("No user with `user_id`=%s found in the database", user_id)
     return UserRole(row[0]) if row else None
 
+async def get_user_context(
+        conn: AsyncConnection,
+        *,
+        user_id: int,
+) -> tuple[UserRole | None, int | None]:
+    async with conn.cursor() as cursor:
+        data = await cursor.execute(
+            query="""
+                SELECT u.role, t.team
+                FROM (SELECT %(user_id)s::bigint AS user_id) q
+                LEFT JOIN users u ON u.user_id = q.user_id
+                LEFT JOIN teams t ON t.user_id = q.user_id;
+        """,
+        params={"user_id": user_id},
+        )
+        row = await data.fetchone()
+    role, team = row if row else (None, None)
+    return (UserRole(role) if role else None), team
+
 async def add_team(
         conn: AsyncConnection,
         *,
@@ -126,68 +145,50 @@ async def get_users(conn: AsyncConnection):
         users = [row[0] for row in rows]
         return users
 
-async def get_tags(conn: AsyncConnection):
+async def assign_place_slots(conn: AsyncConnection) -> int:
+    # слот — номер бита в битовых картах посещений, закрепляется за кодом места навсегда:
+    # places.id растет при каждом импорте (ON CONFLICT тратит значения SERIAL) и меняется при переимпорте
+    async with conn.transaction():
+        async with conn.cursor() as cursor:
+            await cursor.execute("LOCK TABLE place_slots IN SHARE ROW EXCLUSIVE MODE;")
+            await cursor.execute(
+                query="""
+                    INSERT INTO place_slots (district, number, slot)
+                    SELECT p.district, p.number,
+                           (SELECT COALESCE(MAX(slot), -1) FROM place_slots)
+                           + ROW_NUMBER() OVER (ORDER BY p.district, p.number)
+                    FROM places p
+                    LEFT JOIN place_slots s ON s.district = p.district AND s.number = p.number
+                    WHERE s.slot IS NULL AND p.district IS NOT NULL AND p.number IS NOT NULL;
+                """
+            )
+            return cursor.rowcount
+
+async def get_catalog_fingerprint(conn: AsyncConnection) -> str | None:
     async with conn.cursor() as cursor:
-        data = await cursor.execute(
-            query="""
-                SELECT DISTINCT tag
-                FROM places
-                ORDER BY tag;
-            """
-        )
-        rows = await data.fetchall()
-        tags= [row[0] for row in rows]
-        return tags
+        data = await cursor.execute("SELECT fingerprint FROM catalog_state WHERE id = 1;")
+        row = await data.fetchone()
+        return row[0] if row else None
+
+async def set_catalog_fingerprint(conn: AsyncConnection, fingerprint: str):
+    async with conn.cursor() as cursor:
+        await cursor.execute("""
+                            INSERT INTO catalog_state (id, fingerprint) VALUES (1, %s)
+                            ON CONFLICT (id) DO UPDATE SET fingerprint = EXCLUDED.fingerprint;
+                        """, (fingerprint,))
 
-async def get_places_by_tag(conn: AsyncConnection, tag: str):
+async def get_places(conn: AsyncConnection):
     async with conn.cursor() as cursor:
         data = await cursor.execute(
             query="""
-                SELECT district, number, name
-                FROM places
-                WHERE tag = %(tag)s
-                ORDER BY district, number;
-            """,
-            params={"tag":tag,}
+                SELECT s.slot, p.tag, p.district, p.number, p.name, p.answer, p.papka
+                FROM places p
+                JOIN place_slots s ON s.district = p.district AND s.number = p.number;
+            """
         )
         rows = await data.fetchall()
         return rows
-    
-async def get_districts(conn: AsyncConnection):
-    async with conn.cursor() as cursor:
-        data = await cursor.execute("SELECT DISTINCT district FROM places ORDER BY district;")
-        rows = await data.fetchall()
-        districts = [row[0] for row in rows]
-        return districts
-    
-async def get_places_by_district(conn: AsyncConnection, district: str):
-    async with conn.cursor() as cursor:
-        data = await cursor.execute(
-            query="""
-                SELECT district, number, name
-                FROM places
-                WHERE district = %(district)s
-                ORDER BY number;
-            """,
-            params={"district":district,}
-        )
-        row = await data.fetchall()
-        return row
 
-async def get_answer(conn: AsyncConnection, district: str, number: int):
-    async with conn.cursor() as cursor:
-        data = await cursor.execute(
-            query="""
-                SELECT name, answer, papka
-                FROM places
-                WHERE district = %(district)s AND number = %(number)s;
-            """,
-            params={"district": district,
-                    "number": number,}
-        )
-        row = await data.fetchone()
-        return row
-    
 async def get_team_by_user(conn: AsyncConnection, user_id: int):
     async with conn.cursor() as cursor:
         data = await cursor.execute(
@@ -212,40 +213,97 @@ async def get_user_by_team(conn: AsyncConnection, team: int):
         row = await data.fetchone()
         return row
 
-async def add_travel(conn: AsyncConnection, team: int):
+async def apply_team_counters(conn: AsyncConnection, batch: str, rows: list[tuple[int, int, int]]) -> bool:
+    # пачка помечается в той же транзакции: повтор после падения до очистки Redis ничего не удвоит
+    async with conn.transaction():
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                                INSERT INTO counter_flushes (id, batch) VALUES (1, %s)
+                                ON CONFLICT (id) DO UPDATE SET batch = EXCLUDED.batch
+                                WHERE counter_flushes.batch <> EXCLUDED.batch;
+                            """, (batch,))
+            if not cursor.rowcount:
+                return False
+            if rows:
+                teams, travels, clues = (list(col) for col in zip(*rows))
+                await cursor.execute("""
+                                    UPDATE teams t
+                                    SET travels = COALESCE(t.travels, 0) + v.travels,
+                                        clue = COALESCE(t.clue, 0) + v.clue
+                                    FROM unnest(%s::int[], %s::int[], %s::int[]) AS v(team, travels, clue)
+                                    WHERE t.team = v.team;
+                                """, (teams, travels, clues))
+    return True
+
+async def get_team_counters(conn: AsyncConnection, team: int):
+    async with conn.cursor() as cursor:
+        data = await cursor.execute(
+            query="""
+                SELECT COALESCE(travels, 0), COALESCE(clue, 0)
+                FROM teams
+                WHERE team = %(team)s;
+            """,
+            params={"team": team,}
+        )
+        row = await data.fetchone()
+        return row
+
+async def get_all_team_counters(conn: AsyncConnection):
+    async with conn.cursor() as cursor:
+        data = await cursor.execute("""
+                            SELECT team, COALESCE(travels, 0), COALESCE(clue, 0)
+                            FROM teams
+                            WHERE role = 'user';
+                        """)
+        return await data.fetchall()
+
+async def insert_visits(conn: AsyncConnection, rows: list[tuple[int, str, int, int | None, datetime]]):
+    if not rows:
+        return
+    teams, districts, numbers, papki, visited_at = (list(col) for col in zip(*rows))
     async with conn.cursor() as cursor:
         await cursor.execute("""
-                            UPDATE teams
-                            SET travels = COALESCE(travels, 0) + 1
-                            WHERE team = %s;
-                        """, (team,))
+                            INSERT INTO visits(team, district, number, papka, visited_at)
+                            SELECT * FROM unnest(%s::int[], %s::varchar[], %s::int[], %s::int[], %s::timestamptz[])
+                            ON CONFLICT (team, district, number) DO NOTHING;
+                        """, (teams, districts, numbers, papki, visited_at))
 
-async def add_clue(conn: AsyncConnection, team: int):
+async def get_all_visits(conn: AsyncConnection):
+    async with conn.cursor() as cursor:
+        data = await cursor.execute("""
+                            SELECT team, district, number
+                            FROM visits;
+                        """)
+        return await data.fetchall()
+
+async def delete_team_visits(conn: AsyncConnection, team: int):
     async with conn.cursor() as cursor:
         await cursor.execute("""
-                            UPDATE teams
-                            SET clue = COALESCE(clue, 0) + 1
+                            DELETE FROM visits
                             WHERE team = %s;
                         """, (team,))
 
-async def delete_team(conn: AsyncConnection, team: int):
-    user_row = await get_user_by_team(conn, team)
-    user_id = user_row[0] if user_row else None
-
+async def delete_team(conn: AsyncConnection, team: int) -> int | None:
     async with conn.cursor() as cursor:
         await cursor.execute("""
-                            DELETE FROM teams
+                            DELETE FROM visits
                             WHERE team = %s;
                         """, (team,))
-        deleted_count = cursor.rowcount
-        if deleted_count and user_id:
+        data = await cursor.execute("""
+                            DELETE FROM teams
+                            WHERE team = %s
+                            RETURNING user_id;
+                        """, (team,))
+        row = await data.fetchone()
+        user_id = row[0] if row else None
+        if user_id:
             await cursor.execute(
                 """
                     DELETE FROM users 
                     WHERE user_id = %s;
             """, (user_id,)
             )
-        return deleted_count > 0
+        return user_id
     
 async def add_answer(conn: AsyncConnection, text: str, user_id: int):
     async with conn.cursor() as cursor:
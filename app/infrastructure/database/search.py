@@ -0,0 +1,59 @@
+from collections import Counter
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from app.infrastructure.database.catalog import Place
+
+MIN_INNER_GRAMS = 2
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().replace("ё", "е").split())
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, places: Iterable["Place"] = ()):
+        self._docs: dict[int, str] = {}
+        self._order: list[int] = []
+        self._grams: dict[str, list[int]] = {}
+        for place in places:
+            doc = normalize_query(" ".join(
+                part for part in (place.code, place.name, place.tag, place.district) if part
+            ))
+            self._docs[place.id] = doc
+            self._order.append(place.id)
+            for gram in trigrams(doc):
+                self._grams.setdefault(gram, []).append(place.id)
+
+    def search(self, query: str, limit: int = 50) -> list[int]:
+        query = normalize_query(query)
+        if not query:
+            return self._order[:limit]
+
+        grams = trigrams(query)
+        # триграммы целиком внутри слов: совпадение по пробелам-отступам ничего не значит
+        inner = {gram for gram in grams if " " not in gram}
+        scores: Counter[int] = Counter()
+        inner_scores: Counter[int] = Counter()
+        for gram in grams:
+            for place_id in self._grams.get(gram, ()):
+                scores[place_id] += 1
+                if gram in inner:
+                    inner_scores[place_id] += 1
+
+        # подстрока проходит всегда, иначе — половина триграмм запроса и хотя бы две внутри слов
+        ranked = sorted(
+            (
+                (substring, score, place_id)
+                for place_id, score in scores.items()
+                if (substring := query in self._docs[place_id])
+                or (score * 2 >= len(grams) and inner_scores[place_id] >= MIN_INNER_GRAMS)
+            ),
+            key=lambda item: (not item[0], -item[1]),
+        )
+        return [place_id for _, _, place_id in ranked[:limit]]
@@ -0,0 +1,65 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg_pool import AsyncConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledCursor:
+    def __init__(self, pool: AsyncConnectionPool, autocommit: bool, args: tuple, kwargs: dict):
+        self.pool = pool
+        self.autocommit = autocommit
+        self.args = args
+        self.kwargs = kwargs
+
+    async def __aenter__(self) -> AsyncCursor:
+        self._conn_cm = self.pool.connection()
+        self._conn = await self._conn_cm.__aenter__()
+        try:
+            if self.autocommit:
+                await self._conn.set_autocommit(True)
+            self._cursor = self._conn.cursor(*self.args, **self.kwargs)
+            return await self._cursor.__aenter__()
+        except BaseException as e:
+            # __aexit__ не вызовется — без этого соединение не вернется в пул
+            await self._conn_cm.__aexit__(type(e), e, e.__traceback__)
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            await self._cursor.__aexit__(exc_type, exc, tb)
+            if self.autocommit:
+                await self._conn.set_autocommit(False)
+        finally:
+            # пул коммитит транзакцию или откатывает ее при ошибке и сразу забирает соединение
+            await self._conn_cm.__aexit__(exc_type, exc, tb)
+
+
+# cursor() берет соединение из пула на время одного блока,
+# поэтому хендл можно передавать в функции из db.py как обычное соединение.
+# Блок cursor() — одна транзакция: запись из нескольких запросов не закоммитится наполовину.
+# Несколько функций из db.py одной транзакцией — через transaction().
+# В autocommit, без BEGIN/COMMIT, — только горячие чтения через reader().
+class LazyConnection:
+    def __init__(self, pool: AsyncConnectionPool, autocommit: bool = False):
+        self.pool = pool
+        self.autocommit = autocommit
+
+    def cursor(self, *args, **kwargs) -> _PooledCursor:
+        return _PooledCursor(self.pool, self.autocommit, args, kwargs)
+
+    def reader(self) -> "LazyConnection":
+        return LazyConnection(self.pool, autocommit=True)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[AsyncConnection]:
+        async with self.pool.connection() as conn:
+            try:
+                async with conn.transaction():
+                    yield conn
+            except Exception as e:
+                logger.exception('Transaction rolled back due to error :%s', e)
+                raise
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import uuid
+
+from psycopg_pool import AsyncConnectionPool
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ResponseError
+
+from app.infrastructure.database.db import apply_team_counters, get_all_team_counters, get_team_counters
+from app.infrastructure.database.session import LazyConnection
+from app.infrastructure.game.leaderboard import Leaderboard
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "counters:pending"
+FLUSHING_KEY = "counters:flushing"
+# id сбрасываемой пачки, Postgres помнит id последней примененной
+BATCH_KEY = "counters:flushing:batch"
+
+COLUMNS = ("travels", "clue")
+
+
+def _field(team: int | str, column: str) -> str:
+    return f"{team}:{column}"
+
+
+class TeamCounters:
+    def __init__(
+        self,
+        redis: Redis,
+        pool: AsyncConnectionPool,
+        interval: float = 5.0,
+        leaderboard: Leaderboard | None = None,
+    ):
+        self.redis = redis
+        self.pool = pool
+        self.interval = interval
+        self.leaderboard = leaderboard
+        self._lock = asyncio.Lock()
+
+    def stage_visits(self, pipe: Pipeline, team: int | str, visits: int = 1, clues: int = 0) -> None:
+        # в чужой pipeline: вызывающий может записать что-то вместе с очками одной транзакцией
+        if visits:
+            pipe.hincrby(PENDING_KEY, _field(team, "travels"), visits)
+        if clues:
+            pipe.hincrby(PENDING_KEY, _field(team, "clue"), clues)
+        if self.leaderboard and (visits or clues):
+            self.leaderboard.stage(pipe, team, visits, clues)
+
+    async def record_visits(self, team: int | str, visits: int = 1, clues: int = 0) -> None:
+        if not visits and not clues:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self.stage_visits(pipe, team, visits, clues)
+            await pipe.execute()
+
+    async def discard(self, team: int | str) -> None:
+        fields = [_field(team, column) for column in COLUMNS]
+        await self.redis.hdel(PENDING_KEY, *fields)
+        await self.redis.hdel(FLUSHING_KEY, *fields)
+        if self.leaderboard:
+            await self.leaderboard.remove(team)
+
+    async def pending(self, team: int | str) -> dict[str, int]:
+        fields = [_field(team, column) for column in COLUMNS]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(PENDING_KEY, fields)
+            pipe.hmget(FLUSHING_KEY, fields)
+            pending, flushing = await pipe.execute()
+        return {
+            column: int(a or 0) + int(b or 0)
+            for column, a, b in zip(COLUMNS, pending, flushing)
+        }
+
+    async def totals(self, conn: LazyConnection, team: int) -> tuple[int, int] | None:
+        row = await get_team_counters(conn, team)
+        if row is None:
+            return None
+        delta = await self.pending(team)
+        return row[0] + delta["travels"], row[1] + delta["clue"]
+
+    async def all_totals(self) -> dict[int, tuple[int, int]]:
+        async with self.pool.connection() as conn:
+            rows = await get_all_team_counters(conn)
+        totals = {team: [travels, clues] for team, travels, clues in rows}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(PENDING_KEY)
+            pipe.hgetall(FLUSHING_KEY)
+            buffers = await pipe.execute()
+        for raw in buffers:
+            for field, value in raw.items():
+                team, column = field.rsplit(":", 1)
+                if int(team) in totals:
+                    totals[int(team)][COLUMNS.index(column)] += int(value)
+        return {team: (travels, clues) for team, (travels, clues) in totals.items()}
+
+    async def flush(self) -> int:
+        async with self._lock:
+            # незавершенный прошлый сброс доливаем первым, новые дельты копятся в PENDING_KEY
+            if not await self.redis.exists(FLUSHING_KEY):
+                try:
+                    await self.redis.rename(PENDING_KEY, FLUSHING_KEY)
+                except ResponseError:
+                    return 0
+                # новая пачка — новый id, даже если от прошлой что-то осталось
+                await self.redis.delete(BATCH_KEY)
+
+            # пачки сбрасываются строго по одной, поэтому Postgres достаточно помнить последнюю
+            batch = await self.redis.get(BATCH_KEY)
+            if batch is None:
+                batch = uuid.uuid4().hex
+                await self.redis.set(BATCH_KEY, batch)
+
+            raw = await self.redis.hgetall(FLUSHING_KEY)
+            deltas: dict[int, dict[str, int]] = {}
+            for field, value in raw.items():
+                team, column = field.rsplit(":", 1)
+                deltas.setdefault(int(team), {})[column] = int(value)
+            rows = [
+                (team, delta.get("travels", 0), delta.get("clue", 0))
+                for team, delta in deltas.items()
+            ]
+
+            async with self.pool.connection() as conn:
+                applied = await apply_team_counters(conn, batch, rows)
+            if not applied:
+                logger.warning("[counters] batch %s was already applied, dropping it", batch)
+            await self.redis.delete(FLUSHING_KEY, BATCH_KEY)
+            logger.debug("[counters] flushed %d teams", len(rows))
+            return len(rows) if applied else 0
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.flush()
+                except Exception:
+                    logger.exception("[counters] flush failed")
+        except asyncio.CancelledError:
+            await self.flush()
+            logger.info("[counters] final flush done")
+            raise
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Iterable
+
+from psycopg_pool import AsyncConnectionPool
+from redis.asyncio import Redis
+
+from app.infrastructure.database.catalog import Catalog, Place
+from app.infrastructure.database.db import delete_team_visits, get_all_visits, insert_visits
+from app.infrastructure.database.session import LazyConnection
+from app.infrastructure.game.visits import claim_visits
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "visits:pending"
+# сбрасывают и ведущий процесс, и воркер админа (/delete_visits, /delete_team)
+FLUSH_LOCK_KEY = "visits:flush:lock"
+FLUSH_LOCK_TTL = 60
+
+BATCH_SIZE = 1000
+
+
+class VisitHistory:
+    def __init__(self, redis: Redis, pool: AsyncConnectionPool, interval: float = 5.0, batch_size: int = BATCH_SIZE):
+        self.redis = redis
+        self.pool = pool
+        self.interval = interval
+        self.batch_size = batch_size
+
+    async def record(self, team: int | str, places: Iterable[Place]) -> None:
+        visited_at = datetime.now(timezone.utc).isoformat()
+        entries = [
+            json.dumps([int(team), place.district, place.number, place.papka, visited_at])
+            for place in places
+        ]
+        if entries:
+            await self.redis.rpush(PENDING_KEY, *entries)
+
+    async def flush(self) -> int:
+        written = 0
+        async with self.redis.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TTL) as lock:
+            while True:
+                raw = await self.redis.lrange(PENDING_KEY, 0, self.batch_size - 1)
+                if not raw:
+                    break
+                rows = []
+                for entry in raw:
+                    team, district, number, papka, visited_at = json.loads(entry)
+                    rows.append((team, district, number, papka, datetime.fromisoformat(visited_at)))
+                async with self.pool.connection() as conn:
+                    await insert_visits(conn, rows)
+                # повтор пачки после сбоя безопасен: дубли отсекает visits_uq
+                await self.redis.ltrim(PENDING_KEY, len(raw), -1)
+                written += len(rows)
+                # LTRIM с головы верен, только пока сбрасывает один процесс — держим замок на время всего сброса
+                await lock.reacquire()
+        if written:
+            logger.debug("[history] flushed %d visits", written)
+        return written
+
+    async def forget(self, conn: LazyConnection, team: int) -> None:
+        # сначала доливаем буфер, иначе удаленные посещения вернутся следующим сбросом
+        await self.flush()
+        await delete_team_visits(conn, team)
+
+    async def restore(self, catalog: Catalog) -> int:
+        if not catalog.places:
+            logger.warning("[history] catalog is empty, visits are not restored")
+            return 0
+        async with self.pool.connection() as conn:
+            rows = await get_all_visits(conn)
+        by_team: dict[int, list[int]] = defaultdict(list)
+        unknown = 0
+        for team, district, number in rows:
+            place = catalog.places.get((district, number))
+            if place is None:
+                unknown += 1
+                continue
+            by_team[team].append(place.id)
+        restored = 0
+        for team, place_ids in by_team.items():
+            claimed = await claim_visits(self.redis, team, place_ids)
+            restored += sum(claimed)
+        if unknown:
+            logger.warning("[history] %d stored visits are not in the catalog", unknown)
+        logger.info("[history] restored %d of %d visits from Postgres", restored, len(rows))
+        return restored
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.flush()
+                except Exception:
+                    logger.exception("[history] flush failed")
+        except asyncio.CancelledError:
+            await self.flush()
+            logger.info("[history] final flush done")
+            raise
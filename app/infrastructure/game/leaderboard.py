@@ -0,0 +1,67 @@
+import logging
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+logger = logging.getLogger(__name__)
+
+BOARDS = ("travels", "clue", "score")
+
+
+def board_key(board: str) -> str:
+    return f"leaderboard:{board}"
+
+
+class Leaderboard:
+    # очки = travels * travel_weight + clue * clue_weight
+    def __init__(self, redis: Redis, travel_weight: int = 1, clue_weight: int = 1):
+        self.redis = redis
+        self.travel_weight = travel_weight
+        self.clue_weight = clue_weight
+
+    def score(self, travels: int, clues: int) -> int:
+        return travels * self.travel_weight + clues * self.clue_weight
+
+    def stage(self, pipe: Pipeline, team: int | str, visits: int, clues: int) -> None:
+        # пишется в том же конвейере, что и дельты счетчиков
+        member = str(team)
+        if visits:
+            pipe.zincrby(board_key("travels"), visits, member)
+        if clues:
+            pipe.zincrby(board_key("clue"), clues, member)
+        pipe.zincrby(board_key("score"), self.score(visits, clues), member)
+
+    async def remove(self, team: int | str) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for board in BOARDS:
+                pipe.zrem(board_key(board), str(team))
+            await pipe.execute()
+
+    async def rebuild(self, totals: dict[int, tuple[int, int]]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for board in BOARDS:
+                pipe.delete(board_key(board))
+            if totals:
+                pipe.zadd(board_key("travels"), {str(team): travels for team, (travels, _) in totals.items()})
+                pipe.zadd(board_key("clue"), {str(team): clues for team, (_, clues) in totals.items()})
+                pipe.zadd(board_key("score"), {
+                    str(team): self.score(travels, clues) for team, (travels, clues) in totals.items()
+                })
+            await pipe.execute()
+        logger.info("[leaderboard] rebuilt for %d teams", len(totals))
+
+    async def top(self, limit: int = 10, board: str = "score") -> list[tuple[int, int, int, int]]:
+        # ZREVRANGE — O(log N + limit), остальные столбцы добираем по найденным командам
+        ranked = await self.redis.zrevrange(board_key(board), 0, limit - 1, withscores=True)
+        if not ranked:
+            return []
+        members = [member for member, _ in ranked]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zmscore(board_key("travels"), members)
+            pipe.zmscore(board_key("clue"), members)
+            pipe.zmscore(board_key("score"), members)
+            travels, clues, scores = await pipe.execute()
+        return [
+            (int(member), int(t or 0), int(c or 0), int(s or 0))
+            for member, t, c, s in zip(members, travels, clues, scores)
+        ]
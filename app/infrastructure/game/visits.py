@@ -0,0 +1,113 @@
+import logging
+import uuid
+
+from redis.asyncio import Redis
+from redis.client import NEVER_DECODE
+
+from app.infrastructure.database.catalog import Catalog
+
+logger = logging.getLogger(__name__)
+
+
+# по биту на место, номер бита — слот места (Place.id)
+def visit_key(team: int | str) -> str:
+    return f"team:{team}:slots"
+
+
+# самый старый формат: множество строк вида "СЗ-4"
+def legacy_visit_key(team: int | str) -> str:
+    return f"team:{team}:visited"
+
+
+def _bits(bitmap: bytes) -> set[int]:
+    # в Redis старший бит байта идет первым
+    return {
+        byte_index * 8 + bit
+        for byte_index, byte in enumerate(bitmap) if byte
+        for bit in range(8) if byte & (0x80 >> bit)
+    }
+
+
+async def _get_bitmap(redis: Redis, key: str) -> bytes:
+    # клиент создан с decode_responses=True, а битовая карта — не UTF-8
+    return await redis.execute_command("GET", key, **{NEVER_DECODE: []}) or b""
+
+
+async def claim_visits(redis: Redis, team: int | str, place_ids: list[int]) -> list[bool]:
+    if not place_ids:
+        return []
+    key = visit_key(team)
+    # SETBIT атомарно ставит бит и возвращает старое значение: 0 — первое посещение
+    async with redis.pipeline(transaction=False) as pipe:
+        for place_id in place_ids:
+            pipe.setbit(key, place_id, 1)
+        results = await pipe.execute()
+    return [old == 0 for old in results]
+
+
+async def release_visits(redis: Redis, team: int | str, place_ids: list[int]) -> None:
+    if not place_ids:
+        return
+    key = visit_key(team)
+    async with redis.pipeline(transaction=False) as pipe:
+        for place_id in place_ids:
+            pipe.setbit(key, place_id, 0)
+        await pipe.execute()
+
+
+async def is_visited(redis: Redis, team: int | str, place_id: int) -> bool:
+    return bool(await redis.getbit(visit_key(team), place_id))
+
+
+async def count_visits(redis: Redis, team: int | str) -> int:
+    return await redis.bitcount(visit_key(team))
+
+
+async def get_visited_ids(redis: Redis, team: int | str) -> set[int]:
+    return _bits(await _get_bitmap(redis, visit_key(team)))
+
+
+def district_progress(visited_ids: set[int], catalog: Catalog) -> dict[str, tuple[int, int]]:
+    return {
+        district: (sum(1 for place in places if place.id in visited_ids), len(places))
+        for district, places in catalog.by_district.items()
+    }
+
+
+async def combine_visits(redis: Redis, teams: list[int], op: str = "AND") -> set[int]:
+    # BITOP AND — места, где были все команды, OR — хотя бы одна
+    if not teams:
+        return set()
+    tmp_key = f"tmp:visits:{uuid.uuid4().hex}"
+    await redis.bitop(op, tmp_key, *(visit_key(team) for team in teams))
+    try:
+        return _bits(await _get_bitmap(redis, tmp_key))
+    finally:
+        await redis.delete(tmp_key)
+
+
+async def delete_visits(redis: Redis, team: int | str) -> None:
+    await redis.delete(visit_key(team), legacy_visit_key(team))
+
+
+async def migrate_visit_sets(redis: Redis, catalog: Catalog) -> int:
+    if not catalog.places:
+        logger.warning("[visits] catalog is empty, legacy visit sets are left as is")
+        return 0
+    by_code = {place.code: place.id for place in catalog.places.values()}
+    migrated = 0
+    async for key in redis.scan_iter(match=legacy_visit_key("*")):
+        team = key.split(":")[1]
+        codes = await redis.smembers(key)
+        place_ids = [by_code[code] for code in codes if code in by_code]
+        await claim_visits(redis, team, place_ids)
+        unknown = len(codes) - len(place_ids)
+        if unknown:
+            # не теряем то, что не смогли сопоставить, — старое множество остается
+            logger.warning("[visits] team %s: %d legacy visits are not in the catalog", team, unknown)
+            continue
+        await redis.delete(key)
+        migrated += 1
+    if migrated:
+        logger.info("[visits] migrated %d legacy visit sets to bitmaps", migrated)
+    return migrated
@@ -6,6 +6,7 @@ from typing import Any
 from config.config import load_config
 from app.infrastructure.integration.sheets_client import make_gspread_client_from_file, fetch_values
 from app.infrastructure.integration.bulk_upsert import bulk_upsert
+from app.infrastructure.database.catalog import load_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -132,4 +133,5 @@ async def import_all_from_config(pg_pool) -> list[tuple[str, int]]:
                     await cur.execute(delete_sql, tuple(params))
                 logger.info("[pull_upsert] delete_missing applied for table %s", table)
 
+    await load_catalog(pg_pool, assign_slots=True)
     return results
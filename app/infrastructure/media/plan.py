@@ -0,0 +1,129 @@
+import os
+import re
+from dataclasses import dataclass
+
+MEDIA_ROOT = "media"
+
+TEXT_LIMIT = 4096
+
+ALBUM_LIMIT = 10
+
+EXTENSIONS = {
+    "photo": [".jpg", ".jpeg", ".png", ".gif", ".webp"],
+    "video": [".mp4", ".mov", ".avi", ".mkv"],
+    "audio": [".mp3", ".ogg", ".wav", ".m4a"],
+}
+
+_MEDIA_REF = re.compile(r"(\[[^\]]+\])")
+
+
+@dataclass(frozen=True, slots=True)
+class TextSegment:
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class MediaSegment:
+    filename: str
+    path: str
+    kind: str
+
+
+@dataclass(frozen=True, slots=True)
+class MediaGroup:
+    items: tuple[MediaSegment, ...]
+
+
+Segment = TextSegment | MediaSegment | MediaGroup
+
+# фото и видео можно мешать в одном альбоме, аудио — только с аудио
+_ALBUM_FAMILY = {"photo": "visual", "video": "visual", "audio": "audio"}
+
+
+def get_media_type(filename: str) -> str | None:
+    ext = os.path.splitext(filename.lower())[1]
+    for kind, exts in EXTENSIONS.items():
+        if ext in exts:
+            return kind
+    return None
+
+
+def iter_media_refs(answer: str | None):
+    if not answer:
+        return
+    for part in _MEDIA_REF.split(answer):
+        part = part.strip()
+        if part.startswith("[") and part.endswith("]"):
+            yield part[1:-1]
+
+
+def split_text(text: str, limit: int = TEXT_LIMIT) -> list[str]:
+    chunks: list[str] = []
+    while len(text) > limit:
+        # режем по последнему переносу строки, иначе по пробелу, иначе как есть
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunk = text[:cut].strip()
+        if chunk:
+            chunks.append(chunk)
+        text = text[cut:].strip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def group_media(segments: list[Segment]) -> list[Segment]:
+    grouped: list[Segment] = []
+    run: list[MediaSegment] = []
+
+    def flush() -> None:
+        if len(run) == 1:
+            grouped.append(run[0])
+        elif run:
+            grouped.append(MediaGroup(tuple(run)))
+        run.clear()
+
+    for segment in segments:
+        if isinstance(segment, MediaSegment):
+            if run and (
+                len(run) == ALBUM_LIMIT
+                or _ALBUM_FAMILY[run[0].kind] != _ALBUM_FAMILY[segment.kind]
+            ):
+                flush()
+            run.append(segment)
+        else:
+            flush()
+            grouped.append(segment)
+    flush()
+    return grouped
+
+
+def compile_answer(answer: str | None, media_root: str = MEDIA_ROOT) -> tuple[tuple[Segment, ...], list[str]]:
+    segments: list[Segment] = []
+    problems: list[str] = []
+    if not answer:
+        return (), problems
+
+    for part in _MEDIA_REF.split(answer):
+        part = part.strip()
+        if not part:
+            continue
+
+        if part.startswith("[") and part.endswith("]"):
+            filename = part[1:-1]
+            file_path = os.path.join(media_root, filename)
+            if not os.path.exists(file_path):
+                problems.append(f"файл {filename} не найден")
+                continue
+            kind = get_media_type(filename)
+            if kind is None:
+                problems.append(f"неизвестный тип файла {filename}")
+                continue
+            segments.append(MediaSegment(filename=filename, path=file_path, kind=kind))
+        else:
+            segments.extend(TextSegment(chunk) for chunk in split_text(part))
+
+    return tuple(group_media(segments)), problems
@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+
+from aiogram.types import FSInputFile, Message
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_KEY = "media:file_ids"
+
+
+def fingerprint(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def file_id_of(message: Message) -> str | None:
+    if message.photo:
+        return message.photo[-1].file_id
+    for media in (message.video, message.audio, message.animation, message.document):
+        if media:
+            return media.file_id
+    return None
+
+
+class MediaRegistry:
+    def __init__(self, redis: Redis, key: str = REGISTRY_KEY):
+        self.redis = redis
+        self.key = key
+
+    async def get(self, path: str) -> str | None:
+        raw = await self.redis.hget(self.key, path)
+        if not raw:
+            return None
+        entry = json.loads(raw)
+        try:
+            current = fingerprint(path)
+        except OSError:
+            current = None
+        if entry.get("fp") != current:
+            # файл поменялся или пропал — старый file_id больше не подходит
+            await self.redis.hdel(self.key, path)
+            logger.info("[media] %s changed on disk, file_id dropped", path)
+            return None
+        return entry.get("file_id")
+
+    async def set(self, path: str, file_id: str) -> None:
+        entry = {"fp": fingerprint(path), "file_id": file_id}
+        await self.redis.hset(self.key, path, json.dumps(entry))
+
+    async def resolve(self, path: str) -> str | FSInputFile:
+        file_id = await self.get(path)
+        return file_id if file_id else FSInputFile(path)
+
+    async def remember(self, path: str, sent: Message) -> None:
+        file_id = file_id_of(sent)
+        if file_id:
+            await self.set(path, file_id)
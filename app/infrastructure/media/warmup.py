@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import FSInputFile, Message
+
+from app.infrastructure.database.catalog import get_catalog
+from app.infrastructure.media.plan import MEDIA_ROOT, get_media_type, iter_media_refs
+from app.infrastructure.media.registry import MediaRegistry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupResult:
+    total: int = 0
+    done: int = 0
+    uploaded: int = 0
+    cached: int = 0
+    missing: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+
+    def format(self, title: str) -> str:
+        text = (
+            f"{title}: {self.done}/{self.total}\n"
+            f"Загружено: {self.uploaded}\n"
+            f"Уже были: {self.cached}\n"
+            f"Ошибки: {len(self.failed)}"
+        )
+        if self.missing:
+            text += "\nНе найдены:\n" + "\n".join(self.missing)
+        return text
+
+
+def collect_media() -> list[str]:
+    filenames: set[str] = set()
+    for place in get_catalog().places.values():
+        filenames.update(iter_media_refs(place.answer))
+    return sorted(filenames)
+
+
+async def _upload(bot: Bot, chat_id: int, path: str, kind: str | None) -> Message:
+    file = FSInputFile(path)
+    if kind == "photo":
+        return await bot.send_photo(chat_id, file, disable_notification=True)
+    if kind == "video":
+        return await bot.send_video(chat_id, file, disable_notification=True)
+    if kind == "audio":
+        return await bot.send_audio(chat_id, file, disable_notification=True)
+    return await bot.send_document(chat_id, file, disable_notification=True)
+
+
+async def warmup_media(
+    bot: Bot,
+    registry: MediaRegistry,
+    chat_id: int,
+    concurrency: int = 4,
+    media_root: str = MEDIA_ROOT,
+    result: WarmupResult | None = None,
+) -> WarmupResult:
+    # result можно передать снаружи, чтобы следить за прогрессом
+    filenames = collect_media()
+    result = result or WarmupResult()
+    result.total = len(filenames)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def warm(filename: str) -> None:
+        path = os.path.join(media_root, filename)
+        if not os.path.exists(path):
+            result.missing.append(filename)
+        elif await registry.get(path):
+            result.cached += 1
+        else:
+            async with semaphore:
+                try:
+                    try:
+                        sent = await _upload(bot, chat_id, path, get_media_type(filename))
+                    except TelegramRetryAfter as e:
+                        await asyncio.sleep(e.retry_after)
+                        sent = await _upload(bot, chat_id, path, get_media_type(filename))
+                    await registry.remember(path, sent)
+                    result.uploaded += 1
+                except (TelegramAPIError, OSError) as e:
+                    logger.warning("[warmup] %s failed: %s", filename, e)
+                    result.failed.append(filename)
+        result.done += 1
+        if result.done % 10 == 0 or result.done == result.total:
+            logger.info("[warmup] %d/%d", result.done, result.total)
+
+    await asyncio.gather(*(warm(filename) for filename in filenames))
+
+    if result.missing:
+        logger.warning("[warmup] missing files: %s", ", ".join(result.missing))
+    logger.info(
+        "[warmup] total=%d uploaded=%d cached=%d missing=%d failed=%d",
+        result.total, result.uploaded, result.cached, len(result.missing), len(result.failed),
+    )
+    return result
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from typing import Any, Hashable
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+READ_COUNT = 50
+READ_BLOCK_MS = 5000
+CLAIM_INTERVAL = 60.0
+
+
+class StreamConsumer:
+    # читает поток через группу: одна очередь на ключ (чат) по порядку, разные ключи — параллельно
+    def __init__(
+        self,
+        redis: Redis,
+        stream: str,
+        group: str,
+        consumer: str,
+        concurrency: int | None,
+        claim_idle_ms: int,
+        capacity: int | None = None,
+    ):
+        self.redis = redis
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.claim_idle_ms = claim_idle_ms
+        # None — не ограничиваем: очередность решает сам process()
+        self._running = asyncio.Semaphore(concurrency) if concurrency else None
+        # прочитанные, но еще не начатые записи — дальше этого из потока не читаем
+        self._capacity = asyncio.Semaphore(capacity or concurrency * 4)
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self._waiting: dict[Hashable, int] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._active: set[str] = set()
+
+    def parse(self, fields: dict[str, str]) -> tuple[Hashable, Any]:
+        raise NotImplementedError
+
+    async def process(self, entry_id: str, payload: Any) -> None:
+        raise NotImplementedError
+
+    def on_ack(self, pipe: Pipeline, entry_id: str) -> None:
+        pass
+
+    async def _ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _handle(self, entry_id: str, key: Hashable, payload: Any) -> None:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        waiting = True
+        try:
+            async with lock:
+                self._capacity.release()
+                waiting = False
+                async with self._running or nullcontext():
+                    await self.process(entry_id, payload)
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.xack(self.stream, self.group, entry_id)
+                self.on_ack(pipe, entry_id)
+                await pipe.execute()
+        finally:
+            if waiting:
+                self._capacity.release()
+            self._active.discard(entry_id)
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                del self._locks[key]
+
+    async def _spawn(self, entries: list[tuple[str, dict[str, str] | None]]) -> None:
+        for entry_id, fields in entries:
+            if entry_id in self._active:
+                # уже в работе: перечитали из своего PEL или забрали через XAUTOCLAIM
+                continue
+            try:
+                key, payload = self.parse(fields)
+            except Exception:
+                # запись вытеснена из потока по MAXLEN или битая
+                logger.warning("[%s] dropping unreadable entry %s", self.stream, entry_id)
+                await self.redis.xack(self.stream, self.group, entry_id)
+                continue
+            await self._capacity.acquire()
+            self._active.add(entry_id)
+            task = asyncio.create_task(self._handle(entry_id, key, payload), name=f"{self.stream}-{entry_id}")
+            self._tasks.add(task)
+            task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("[%s] %s failed", self.stream, task.get_name(), exc_info=task.exception())
+
+    async def _read(self, stream_id: str, block: int | None = None) -> list[tuple[str, dict[str, str] | None]]:
+        response = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: stream_id}, count=READ_COUNT, block=block
+        )
+        return response[0][1] if response else []
+
+    async def _recover(self) -> None:
+        # свои неподтвержденные записи с прошлого запуска
+        cursor = "0"
+        while entries := await self._read(cursor):
+            await self._spawn(entries)
+            cursor = entries[-1][0]
+        await self._claim_abandoned()
+
+    async def _claim_abandoned(self) -> None:
+        start = "0-0"
+        while True:
+            response = await self.redis.xautoclaim(
+                self.stream, self.group, self.consumer,
+                min_idle_time=self.claim_idle_ms, start_id=start, count=READ_COUNT,
+            )
+            start, entries = response[0], response[1]
+            await self._spawn(entries)
+            if start == "0-0":
+                break
+
+    async def _cancel_tasks(self) -> None:
+        # неподтвержденные записи останутся в потоке и продолжатся после рестарта
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def run(self) -> None:
+        await self._ensure_group()
+        try:
+            await self._recover()
+            claimed_at = time.monotonic()
+            while True:
+                await self._spawn(await self._read(">", block=READ_BLOCK_MS))
+                if time.monotonic() - claimed_at > CLAIM_INTERVAL:
+                    await self._claim_abandoned()
+                    claimed_at = time.monotonic()
+        finally:
+            await self._cancel_tasks()
+
+    async def drain(self) -> None:
+        # поток, в который больше не пишут (сменился режим или число воркеров):
+        # дочитываем, дожидаемся брошенных записей и удаляем
+        await self._ensure_group()
+        try:
+            while True:
+                await self._recover()
+                while entries := await self._read(">"):
+                    await self._spawn(entries)
+                await asyncio.gather(*list(self._tasks), return_exceptions=True)
+                pending = await self.redis.xpending(self.stream, self.group)
+                if not pending["pending"]:
+                    break
+                await asyncio.sleep(CLAIM_INTERVAL)
+            await self.redis.delete(self.stream)
+            logger.info("[%s] drained and removed", self.stream)
+        finally:
+            await self._cancel_tasks()
@@ -0,0 +1,27 @@
+# python -m benchmarks.bench_location_parser
+import timeit
+
+from app.infrastructure.database.catalog import build_catalog
+from app.bot.filters.filters import LocationParser, normalize_district, parse_location
+
+DISTRICTS = ["С", "Ю", "З", "В", "СЗ", "СВ", "ЮЗ", "ЮВ", "Ц"]
+INPUTS = ["СЗ-4", "Ю - 16", "cb 7", "  юз—12 ", "ЦЕНТР-1", "привет", "Ю-999"]
+
+def main(number: int = 100_000) -> None:
+    rows = [
+        (i, None, d, n, f"{d}-{n}", "", None)
+        for i, (d, n) in enumerate(((d, n) for d in DISTRICTS for n in range(1, 60)), start=1)
+    ]
+    parser = LocationParser(build_catalog(rows, version=1))
+
+    cases = {
+        "normalize_district": lambda: [normalize_district(t) for t in ("с-з", " Yb ", "ЮЗ")],
+        "parse_location": lambda: [parse_location(t) for t in INPUTS],
+        "LocationParser.match": lambda: [parser.match(t) for t in INPUTS],
+    }
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=number // 10, repeat=5))
+        print(f"{name:<22} {seconds / (number // 10) * 1e6:8.2f} us/batch")
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ logger = logging.getLogger(__name__)
 class BotSettings:
     token: str
     admin_pass: int
+    api_url: str | None = None
 
 @dataclass
 class DatabaseSettings:
@@ -46,6 +47,51 @@ class SheetsFlags:
     sync_on_start: bool
     sync_interval_min: int
 
+@dataclass
+class MediaSettings:
+    stash_chat_id: int | None
+    warmup_on_start: bool
+    warmup_concurrency: int
+
+@dataclass
+class GameSettings:
+    counters_flush_sec: int
+    visits_flush_sec: int
+    restore_visits_on_start: bool
+    score_travel_weight: int
+    score_clue_weight: int
+    leaderboard_chat_id: int | None
+    leaderboard_refresh_sec: int
+
+@dataclass
+class DeliverySettings:
+    consumer: str
+    concurrency: int
+
+@dataclass
+class SchedulerSettings:
+    concurrency: int
+    registration_backlog: int
+    gameplay_backlog: int
+    other_backlog: int
+
+@dataclass
+class WebhookSettings:
+    enabled: bool
+    url: str
+    path: str
+    host: str
+    port: int
+    secret: str
+
+@dataclass
+class ClusterSettings:
+    # single — один процесс, cluster — intake + workers процессов
+    role: str
+    workers: int
+    worker_index: int
+    consumer: str
+
 @dataclass
 class Config:
     bot: BotSettings
@@ -54,6 +100,12 @@ class Config:
     log: LogSettings
     google: GoogleSettings
     sheets: SheetsFlags
+    media: MediaSettings
+    game: GameSettings
+    delivery: DeliverySettings
+    scheduler: SchedulerSettings
+    webhook: WebhookSettings
+    cluster: ClusterSettings
 
 def load_config(path: str | None = None) -> Config:
     env = Env()
@@ -109,13 +161,74 @@ def load_config(path: str | None = None) -> Config:
         sync_interval_min=env.int("SHEETS_SYNC_INTERVAL_MIN", default=0),
     )
 
+    media = MediaSettings(
+        stash_chat_id=env.int("MEDIA_STASH_CHAT_ID", default=None),
+        warmup_on_start=env.bool("MEDIA_WARMUP_ON_START", default=False),
+        warmup_concurrency=env.int("MEDIA_WARMUP_CONCURRENCY", default=4),
+    )
+
+    game = GameSettings(
+        counters_flush_sec=env.int("COUNTERS_FLUSH_SEC", default=5),
+        visits_flush_sec=env.int("VISITS_FLUSH_SEC", default=5),
+        restore_visits_on_start=env.bool("VISITS_RESTORE_ON_START", default=True),
+        score_travel_weight=env.int("SCORE_TRAVEL_WEIGHT", default=1),
+        score_clue_weight=env.int("SCORE_CLUE_WEIGHT", default=1),
+        leaderboard_chat_id=env.int("LEADERBOARD_CHAT_ID", default=None),
+        leaderboard_refresh_sec=env.int("LEADERBOARD_REFRESH_SEC", default=60),
+    )
+
+    delivery = DeliverySettings(
+        consumer=env("DELIVERY_CONSUMER", default="main"),
+        concurrency=env.int("DELIVERY_CONCURRENCY", default=16),
+    )
+
+    scheduler = SchedulerSettings(
+        concurrency=env.int("SCHEDULER_CONCURRENCY", default=8),
+        registration_backlog=env.int("SCHEDULER_REGISTRATION_BACKLOG", default=200),
+        gameplay_backlog=env.int("SCHEDULER_GAMEPLAY_BACKLOG", default=1000),
+        other_backlog=env.int("SCHEDULER_OTHER_BACKLOG", default=100),
+    )
+    if scheduler.concurrency < 1:
+        raise ValueError("SCHEDULER_CONCURRENCY must be positive")
+
+    webhook = WebhookSettings(
+        enabled=env.bool("WEBHOOK_ENABLED", default=False),
+        url=env("WEBHOOK_URL", default=""),
+        path=env("WEBHOOK_PATH", default="/webhook"),
+        host=env("WEBHOOK_HOST", default="0.0.0.0"),
+        port=env.int("WEBHOOK_PORT", default=8080),
+        secret=env("WEBHOOK_SECRET", default=""),
+    )
+    if webhook.enabled and not webhook.url:
+        raise ValueError("WEBHOOK_URL must not be empty when WEBHOOK_ENABLED is set")
+    if webhook.enabled and not webhook.secret:
+        # без секрета любой, кто знает адрес, может слать боту поддельные апдейты
+        raise ValueError("WEBHOOK_SECRET must not be empty when WEBHOOK_ENABLED is set")
+
+    cluster = ClusterSettings(
+        role=env("CLUSTER_ROLE", default="single"),
+        workers=env.int("CLUSTER_WORKERS", default=1),
+        worker_index=env.int("WORKER_INDEX", default=0),
+        consumer=env("CLUSTER_CONSUMER", default="main"),
+    )
+    if cluster.role not in ("single", "cluster", "intake", "worker"):
+        raise ValueError("CLUSTER_ROLE must be one of: single, cluster, intake, worker")
+    if cluster.workers < 1 or not 0 <= cluster.worker_index < cluster.workers:
+        raise ValueError("WORKER_INDEX must be in [0, CLUSTER_WORKERS)")
+
     logger.info("Configuration loaded successfully")
 
     return Config(
-        bot=BotSettings(token=token, admin_pass=admin_pass),
+        bot=BotSettings(token=token, admin_pass=admin_pass, api_url=env("BOT_API_URL", default=None)),
         db=db,
         redis=redis,
         log=logg_settings,
         google=google,
-        sheets=sheets
+        sheets=sheets,
+        media=media,
+        game=game,
+        delivery=delivery,
+        scheduler=scheduler,
+        webhook=webhook,
+        cluster=cluster,
     )
@@ -4,6 +4,7 @@ import os
 import sys
 
 from app.bot import main
+from app.bot.cluster import run_cluster
 from config.config import Config, load_config
 
 config: Config = load_config()
@@ -21,4 +22,8 @@ if sys.platform.startswith("win") or os.name == "nt":
     print(os.name)
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-asyncio.run(main(config))
\ No newline at end of file
+if __name__ == "__main__":
+    if config.cluster.role == "cluster":
+        run_cluster(config)
+    else:
+        asyncio.run(main(config))
\ No newline at end of file
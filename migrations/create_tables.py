@@ -58,6 +58,24 @@ async def main():
                             );
                         """
                     )
+                    await cursor.execute(
+                        query="""
+                            CREATE TABLE IF NOT EXISTS place_slots(
+                            district VARCHAR(10) NOT NULL,
+                            number INT NOT NULL,
+                            slot INT NOT NULL UNIQUE,
+                            PRIMARY KEY (district, number)
+                            );
+                        """
+                    )
+                    await cursor.execute(
+                        query="""
+                            CREATE TABLE IF NOT EXISTS catalog_state(
+                            id INT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                            fingerprint VARCHAR(64) NOT NULL
+                            );
+                        """
+                    )
                     await cursor.execute(
                         query="""
                             CREATE TABLE IF NOT EXISTS teams(
@@ -71,7 +89,34 @@ async def main():
                             );
                         """
                     )
-                logger.info("Tables 'user, teams and places' were successfully created")
+                    await cursor.execute(
+                        query="""
+                            CREATE TABLE IF NOT EXISTS counter_flushes(
+                            id INT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                            batch VARCHAR(32) NOT NULL
+                            );
+                        """
+                    )
+                    await cursor.execute(
+                        query="""
+                            CREATE TABLE IF NOT EXISTS visits(
+                            id BIGSERIAL PRIMARY KEY,
+                            team INT NOT NULL,
+                            district VARCHAR(10) NOT NULL,
+                            number INT NOT NULL,
+                            papka INT,
+                            visited_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                            CONSTRAINT visits_uq UNIQUE (team, district, number)
+                            );
+                        """
+                    )
+                    await cursor.execute(
+                        query="CREATE INDEX IF NOT EXISTS visits_visited_at_idx ON visits (visited_at);"
+                    )
+                    await cursor.execute(
+                        query="CREATE INDEX IF NOT EXISTS visits_place_idx ON visits (district, number);"
+                    )
+                logger.info("Tables 'user, teams, places, place_slots and visits' were successfully created")
     except Error as db_error:
         logger.exception("Database-specific error: %s", db_error)
     except Exception as e:
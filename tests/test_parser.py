@@ -0,0 +1,67 @@
+import pytest
+
+from app.bot.filters.filters import LocationParser, parse_location, split_codes
+from app.infrastructure.database.catalog import build_catalog
+
+ROWS = [
+    (0, None, "СЗ", 1, "Сквер", "текст", None),
+    (1, None, "СЗ", 4, "Завод", "текст", None),
+    (2, None, "СЗ", 7, "Мост", "текст", None),
+    (3, None, "Ю", 16, "Рынок", "текст", None),
+]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("СЗ-4", ("СЗ", 4)),
+    (" сз 4 ", ("СЗ", 4)),
+    ("Ю—16", ("Ю", 16)),
+    ("Ю − 16", ("Ю", 16)),
+    # латинские буквы, похожие на кириллицу
+    ("CЗ-4", ("СЗ", 4)),
+    ("c3 - 4", None),
+    ("СЗ4", None),
+    ("СЗ-1234", None),
+    ("СЗАП-4", None),
+    ("привет", None),
+    ("", None),
+])
+def test_parse_location(text, expected):
+    assert parse_location(text) == expected
+
+
+def test_split_codes():
+    assert split_codes("СЗ-4, Ю-16;В-7\n\n ,") == ["СЗ-4", "Ю-16", "В-7"]
+    assert split_codes("  ") == []
+
+
+def test_match_known_place():
+    parser = LocationParser(build_catalog(ROWS, version=1))
+    match = parser.match("сз 4")
+    assert match.code == ("СЗ", 4)
+    assert match.place.name == "Завод"
+    assert match.suggestions == ()
+
+
+def test_match_rejects_garbage():
+    parser = LocationParser(build_catalog(ROWS, version=1))
+    match = parser.match("где я?")
+    assert match.code is None and match.place is None and match.suggestions == ()
+
+
+def test_suggestions_for_unknown_number():
+    parser = LocationParser(build_catalog(ROWS, version=1))
+    match = parser.match("СЗ-5")
+    assert match.place is None
+    # ближайшие номера того же района
+    assert match.suggestions == ("СЗ-4", "СЗ-7", "СЗ-1")
+
+
+def test_suggestions_for_unknown_district():
+    parser = LocationParser(build_catalog(ROWS, version=1))
+    assert parser.match("СХ-4").suggestions == ("СЗ-4",)
+
+
+def test_match_many_keeps_order():
+    parser = LocationParser(build_catalog(ROWS, version=1))
+    matches = parser.match_many(split_codes("Ю-16, СЗ-1, СЗ-9"))
+    assert [m.place.number if m.place else None for m in matches] == [16, 1, None]
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendChatAction, SendMessage
+
+from app.bot.middlewares.rate_governor import RateGovernor, TokenBucket
+
+
+def test_refill_is_capped_by_burst():
+    bucket = TokenBucket(rate=10, burst=2)
+    bucket.tokens, bucket.updated = 0, 100.0
+    bucket._refill(100.1)
+    assert bucket.tokens == pytest.approx(1.0)
+    bucket._refill(105.0)
+    assert bucket.tokens == 2
+
+
+def test_acquire_waits_for_refill():
+    async def scenario() -> float:
+        bucket = TokenBucket(rate=20, burst=2)
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # два токена из запаса, третий — через 1/20 с
+    assert 0.04 <= asyncio.run(scenario()) < 0.5
+
+
+def test_pause_delays_acquire():
+    async def scenario() -> float:
+        bucket = TokenBucket(rate=100, burst=5)
+        bucket.pause(0.2)
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.19
+
+
+def _retry_after(method, seconds: int) -> TelegramRetryAfter:
+    return TelegramRetryAfter(method=method, message="Flood control exceeded", retry_after=seconds)
+
+
+def test_retry_after_pauses_only_that_chat():
+    async def scenario():
+        governor = RateGovernor()
+        sent: dict[int, float] = {}
+        failed = set()
+        started = time.monotonic()
+
+        async def make_request(bot, method):
+            if method.chat_id == 5 and 5 not in failed:
+                failed.add(5)
+                raise _retry_after(method, 1)
+            sent[method.chat_id] = time.monotonic() - started
+            return True
+
+        first = asyncio.create_task(governor(make_request, None, SendMessage(chat_id=5, text="a")))
+        await asyncio.sleep(0.05)
+        await governor(make_request, None, SendMessage(chat_id=6, text="b"))
+        await first
+        return sent, governor.stats
+
+    sent, stats = asyncio.run(scenario())
+    # другой чат не ждал, пока чат 5 на паузе
+    assert sent[6] < 0.5
+    assert sent[5] >= 1.0
+    assert stats.retry_after == 1
+
+
+def test_retry_after_gives_up_after_max_retries():
+    async def scenario():
+        governor = RateGovernor(max_retries=0)
+
+        async def make_request(bot, method):
+            raise _retry_after(method, 1)
+
+        await governor(make_request, None, SendMessage(chat_id=5, text="a"))
+
+    with pytest.raises(TelegramRetryAfter):
+        asyncio.run(scenario())
+
+
+def test_unlimited_methods_bypass_buckets():
+    async def scenario():
+        governor = RateGovernor(chat_rate=0.001, chat_burst=1)
+        calls = 0
+
+        async def make_request(bot, method):
+            nonlocal calls
+            calls += 1
+
+        for _ in range(5):
+            await asyncio.wait_for(
+                governor(make_request, None, SendChatAction(chat_id=5, action="typing")), timeout=0.5
+            )
+        return calls, governor.stats.requests
+
+    assert asyncio.run(scenario()) == (5, 0)
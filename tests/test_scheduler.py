@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.bot.middlewares.scheduler import BUSY_TEXT, Lane, PrioritySlots, UpdateScheduler
+from app.bot.states.states import RegState
+from app.infrastructure.cache.users import UserContextCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeNotifier:
+    def __init__(self, admins: list[int]):
+        self.admins = admins
+
+    async def get_admins(self) -> list[int]:
+        return self.admins
+
+
+class FakeMessage:
+    def __init__(self, text: str | None = "СЗ-4"):
+        self.text = text
+        self.answers: list[str] = []
+
+    async def answer(self, text: str) -> None:
+        self.answers.append(text)
+
+
+def _update(update_id: int, text: str | None = "СЗ-4") -> SimpleNamespace:
+    return SimpleNamespace(update_id=update_id, message=FakeMessage(text))
+
+
+def _data(user_id: int) -> dict:
+    return {"event_from_user": SimpleNamespace(id=user_id)}
+
+
+def _scheduler(**kwargs) -> UpdateScheduler:
+    cache = UserContextCache(fakeredis.FakeAsyncRedis(decode_responses=True))
+    return UpdateScheduler(cache, FakeNotifier([1]), **kwargs)
+
+
+def test_free_slot_goes_to_the_highest_lane():
+    async def scenario() -> list[str]:
+        slots = PrioritySlots(1)
+        await slots.acquire(Lane.GAMEPLAY)
+        order: list[str] = []
+
+        async def wait(name: str, lane: Lane) -> None:
+            await slots.acquire(lane)
+            order.append(name)
+
+        waiters = [
+            asyncio.create_task(wait(name, lane))
+            for name, lane in [
+                ("game-1", Lane.GAMEPLAY),
+                ("other", Lane.OTHER),
+                ("admin", Lane.ADMIN),
+                ("registration", Lane.REGISTRATION),
+                ("game-2", Lane.GAMEPLAY),
+            ]
+        ]
+        await asyncio.sleep(0)
+        for _ in waiters:
+            slots.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiters)
+        return order
+
+    # внутри очереди — по порядку прихода
+    assert asyncio.run(scenario()) == ["admin", "registration", "game-1", "game-2", "other"]
+
+
+def test_classify_lanes():
+    async def scenario() -> list[Lane]:
+        scheduler = _scheduler()
+        await scheduler.load_admins()
+        return [
+            await scheduler.classify(_update(1), _data(1)),
+            await scheduler.classify(_update(2), {**_data(2), "raw_state": RegState.user_team.state}),
+            await scheduler.classify(_update(3), _data(3)),
+            await scheduler.classify(_update(4, text=None), _data(4)),
+        ]
+
+    assert asyncio.run(scenario()) == [Lane.ADMIN, Lane.REGISTRATION, Lane.GAMEPLAY, Lane.OTHER]
+
+
+def test_full_lane_answers_busy():
+    async def scenario():
+        scheduler = _scheduler(concurrency=1, gameplay_backlog=1)
+        await scheduler.load_admins()
+        release = asyncio.Event()
+        handled: list[int] = []
+
+        async def handler(event, data):
+            await release.wait()
+            handled.append(event.update_id)
+
+        updates = [_update(update_id) for update_id in (1, 2, 3)]
+        admin = _update(4)
+        tasks = [asyncio.create_task(scheduler(handler, update, _data(10))) for update in updates]
+        admin_task = asyncio.create_task(scheduler(handler, admin, _data(1)))
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.gather(*tasks, admin_task)
+        return updates, admin, handled, scheduler.stats
+
+    updates, admin, handled, stats = asyncio.run(scenario())
+    # первый занял слот, второй ждет, третьему места в очереди нет
+    assert updates[2].message.answers == [BUSY_TEXT]
+    assert stats.lanes[Lane.GAMEPLAY].dropped == 1
+    # админа не отбрасывают, и он обгоняет ждущего игрока
+    assert admin.message.answers == []
+    assert handled == [1, 4, 2]
@@ -0,0 +1,79 @@
+import asyncio
+import random
+
+import pytest
+
+from app.infrastructure.streams import consumer as consumer_module
+from app.infrastructure.streams.consumer import StreamConsumer
+
+fakeredis = pytest.importorskip("fakeredis")
+
+STREAM = "test:stream"
+GROUP = "test"
+
+
+class RecordingConsumer(StreamConsumer):
+    def __init__(self, redis, consumer: str = "main", fail_once: set[str] = frozenset()):
+        super().__init__(redis, STREAM, GROUP, consumer, concurrency=4, claim_idle_ms=0)
+        self.processed: list[tuple[str, int]] = []
+        self.fail_once = set(fail_once)
+
+    def parse(self, fields: dict[str, str]) -> tuple[str, dict[str, str]]:
+        return fields["chat"], fields
+
+    async def process(self, entry_id: str, payload: dict[str, str]) -> None:
+        # разная длительность — записи разных чатов перемешиваются
+        await asyncio.sleep(random.random() / 100)
+        if payload["n"] in self.fail_once:
+            self.fail_once.discard(payload["n"])
+            raise RuntimeError("boom")
+        self.processed.append((payload["chat"], int(payload["n"])))
+
+
+async def _fill(redis, chats: int, per_chat: int) -> None:
+    await redis.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+    for n in range(per_chat):
+        for chat in range(chats):
+            await redis.xadd(STREAM, {"chat": str(chat), "n": str(n)})
+
+
+def _by_chat(processed: list[tuple[str, int]]) -> dict[str, list[int]]:
+    result: dict[str, list[int]] = {}
+    for chat, n in processed:
+        result.setdefault(chat, []).append(n)
+    return result
+
+
+@pytest.fixture(autouse=True)
+def fast_claims(monkeypatch):
+    monkeypatch.setattr(consumer_module, "CLAIM_INTERVAL", 0.01)
+
+
+def test_entries_of_one_key_run_in_order():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await _fill(redis, chats=3, per_chat=10)
+        consumer = RecordingConsumer(redis)
+        await consumer.drain()
+        return consumer.processed, await redis.exists(STREAM)
+
+    processed, exists = asyncio.run(scenario())
+    assert _by_chat(processed) == {str(chat): list(range(10)) for chat in range(3)}
+    assert not exists
+
+
+def test_pending_entries_are_recovered():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await _fill(redis, chats=2, per_chat=6)
+        # упавший воркер успел прочитать первые записи, но не подтвердил их
+        await redis.xreadgroup(GROUP, "dead", {STREAM: ">"}, count=4)
+        # свои неподтвержденные с прошлого запуска
+        await redis.xreadgroup(GROUP, "main", {STREAM: ">"}, count=2)
+        consumer = RecordingConsumer(redis, fail_once={"5"})
+        await consumer.drain()
+        return consumer.processed
+
+    processed = asyncio.run(scenario())
+    # каждая запись ровно один раз, упавшая на обработке — повторена из PEL
+    assert sorted(processed) == sorted((str(chat), n) for chat in range(2) for n in range(6))
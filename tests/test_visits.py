@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.infrastructure.database.catalog import build_catalog
+from app.infrastructure.game.visits import (
+    claim_visits,
+    combine_visits,
+    count_visits,
+    district_progress,
+    get_visited_ids,
+    is_visited,
+    release_visits,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def test_claim_marks_only_first_visits():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        first = await claim_visits(redis, 1, [0, 9, 17])
+        again = await claim_visits(redis, 1, [9, 3])
+        return first, again, await count_visits(redis, 1), await get_visited_ids(redis, 1)
+
+    first, again, count, visited = asyncio.run(scenario())
+    assert first == [True, True, True]
+    assert again == [False, True]
+    assert count == 4
+    assert visited == {0, 3, 9, 17}
+
+
+def test_release_clears_the_bit():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await claim_visits(redis, 1, [2, 5])
+        await release_visits(redis, 1, [5])
+        return await is_visited(redis, 1, 2), await is_visited(redis, 1, 5), await claim_visits(redis, 1, [5])
+
+    assert asyncio.run(scenario()) == (True, False, [True])
+
+
+def test_combine_and_progress():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await claim_visits(redis, 1, [0, 1, 2])
+        await claim_visits(redis, 2, [1, 2, 3])
+        return await combine_visits(redis, [1, 2], "AND"), await combine_visits(redis, [1, 2], "OR")
+
+    common, either = asyncio.run(scenario())
+    assert common == {1, 2}
+    assert either == {0, 1, 2, 3}
+
+    catalog = build_catalog([
+        (0, None, "СЗ", 1, "a", "текст", None),
+        (1, None, "СЗ", 4, "b", "текст", None),
+        (2, None, "Ю", 16, "c", "текст", None),
+    ], version=1)
+    assert district_progress(common, catalog) == {"СЗ": (1, 2), "Ю": (1, 1)}
@@ -0,0 +1,121 @@
+# python -m pytest -q tests
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import unused_port
+
+from app.bot.webhook import run_webhook
+from config.config import WebhookSettings, load_config
+
+SECRET = "s3cret"
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 5, "type": "private"},
+        "from": {"id": 5, "is_bot": False, "first_name": "a"},
+        "text": "СЗ-4",
+    },
+}
+
+
+class FakeBotApi:
+    # отвечает на любой метод Bot API и запоминает вызовы
+    def __init__(self):
+        self.calls: list[tuple[str, dict]] = []
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls.append((method, dict(await request.post())))
+        result = True
+        if method == "sendMessage":
+            result = {"message_id": 2, "date": 0, "chat": {"id": 5, "type": "private"}, "text": "ok"}
+        return web.json_response({"ok": True, "result": result})
+
+    def called(self, method: str) -> list[dict]:
+        return [params for name, params in self.calls if name == method]
+
+
+async def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def _run_scenario() -> FakeBotApi:
+    api = FakeBotApi()
+    api_runner = web.AppRunner(api.app)
+    await api_runner.setup()
+    api_port = unused_port()
+    await web.TCPSite(api_runner, "127.0.0.1", api_port).start()
+
+    bot = Bot("1:test", session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{api_port}")))
+    router = Router()
+
+    @router.message()
+    async def reply(message: Message, greeting: str):
+        await message.answer(f"{greeting} {message.text}")
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    port = unused_port()
+    settings = WebhookSettings(
+        enabled=True, url="https://example.org/", path="/webhook", host="127.0.0.1", port=port, secret=SECRET
+    )
+    task = asyncio.create_task(run_webhook(dp, bot, settings, greeting="Принято"))
+    try:
+        await _wait_for(lambda: api.called("setWebhook"))
+        async with ClientSession() as client:
+            url = f"http://127.0.0.1:{port}/webhook"
+            wrong = await client.post(url, json=UPDATE, headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+            missing = await client.post(url, json=UPDATE)
+            valid = await client.post(url, json=UPDATE, headers={"X-Telegram-Bot-Api-Secret-Token": SECRET})
+            assert (wrong.status, missing.status, valid.status) == (401, 401, 200)
+        await _wait_for(lambda: api.called("sendMessage"))
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await bot.session.close()
+        await api_runner.cleanup()
+    return api
+
+
+def test_webhook_round_trip():
+    api = asyncio.run(_run_scenario())
+
+    [registered] = api.called("setWebhook")
+    assert registered["url"] == "https://example.org/webhook"
+    assert registered["secret_token"] == SECRET
+    # апдейт с неверным секретом до хендлера не дошел
+    [sent] = api.called("sendMessage")
+    assert sent["chat_id"] == "5"
+    assert sent["text"] == "Принято СЗ-4"
+    assert api.called("deleteWebhook")
+
+
+def test_webhook_requires_secret(monkeypatch):
+    env = {
+        "BOT_TOKEN": "1:test", "ADMIN_PASS": "x", "SA_JSON_PATH": "sa.json",
+        "POSTGRES_DB": "db", "POSTGRES_HOST": "localhost", "POSTGRES_PORT": "5432",
+        "POSTGRES_USER": "u", "POSTGRES_PASSWORD": "p",
+        "REDIS_HOST": "localhost", "REDIS_PORT": "6379", "REDIS_DATABASE": "0",
+        "LOG_LEVEL": "INFO", "LOG_FORMAT": "%(message)s",
+        "WEBHOOK_ENABLED": "true", "WEBHOOK_URL": "https://example.org", "WEBHOOK_SECRET": "",
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    with pytest.raises(ValueError, match="WEBHOOK_SECRET"):
+        load_config()
+
+    monkeypatch.setenv("WEBHOOK_SECRET", SECRET)
+    assert load_config().webhook.secret == SECRET